@@ -1,4 +1,13 @@
+import json
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import time
 from abc import ABC, abstractmethod
+from array import array
+from collections import deque
 from enum import Enum
 
 class Color(Enum):
@@ -63,10 +72,813 @@ class Pawn(Piece):
                    (self.row == 6 and row_diff == -2 and col_diff == 0) or \
                    (row_diff == -1 and col_diff == 1 and board.get_piece(dest_row, dest_col) is not None)
 
-class Board:
+# bitboard.py
+# Squares are numbered row * 8 + col, matching Board: row 0 is White's back rank and col 0 is the a-file.
+WHITE_INDEX = 0
+BLACK_INDEX = 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_SYMBOLS = "PNBRQKpnbrqk"  # Indexed by color * 6 + piece type
+FULL_BOARD = (1 << 64) - 1
+
+CASTLE_WHITE_KING = 1
+CASTLE_WHITE_QUEEN = 2
+CASTLE_BLACK_KING = 4
+CASTLE_BLACK_QUEEN = 8
+
+FLAG_CAPTURE = 1
+FLAG_DOUBLE_PUSH = 2
+FLAG_EN_PASSANT = 4
+FLAG_CASTLE = 8
+
+
+def encode_move(from_square, to_square, promotion=0, flags=0):
+    # Moves are plain ints: from (6 bits) | to (6 bits) | promotion piece type (3 bits) | flags
+    return from_square | (to_square << 6) | (promotion << 12) | (flags << 15)
+
+
+def move_from(move):
+    return move & 63
+
+
+def move_to(move):
+    return (move >> 6) & 63
+
+
+def move_promotion(move):
+    return (move >> 12) & 7
+
+
+def move_flags(move):
+    return move >> 15
+
+
+def square_name(square):
+    return "abcdefgh"[square & 7] + str((square >> 3) + 1)
+
+
+def parse_square(name):
+    if len(name) != 2 or name[0] not in "abcdefgh" or name[1] not in "12345678":
+        raise ValueError(f"Invalid square: {name}")
+    return (int(name[1]) - 1) * 8 + "abcdefgh".index(name[0])
+
+
+def move_to_uci(move):
+    promotion = move_promotion(move)
+    return square_name(move_from(move)) + square_name(move_to(move)) + ("nbrq"[promotion - 1] if promotion else "")
+
+
+def _build_attack_tables():
+    def on_board(row, col):
+        return 0 <= row < 8 and 0 <= col < 8
+
+    def leaper_table(offsets):
+        table = []
+        for square in range(64):
+            row, col = divmod(square, 8)
+            attacks = 0
+            for row_offset, col_offset in offsets:
+                if on_board(row + row_offset, col + col_offset):
+                    attacks |= 1 << ((row + row_offset) * 8 + col + col_offset)
+            table.append(attacks)
+        return table
+
+    knight = leaper_table([(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)])
+    king = leaper_table([(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)])
+    pawn = [leaper_table([(1, -1), (1, 1)]), leaper_table([(-1, -1), (-1, 1)])]
+
+    # Rays in every direction from every square, used for classical sliding attacks.
+    # The first four directions increase the square index, the last four decrease it.
+    directions = [(1, 0), (0, 1), (1, 1), (1, -1), (-1, 0), (0, -1), (-1, -1), (-1, 1)]
+    rays = []
+    for row_step, col_step in directions:
+        table = []
+        for square in range(64):
+            row, col = divmod(square, 8)
+            ray = 0
+            row, col = row + row_step, col + col_step
+            while on_board(row, col):
+                ray |= 1 << (row * 8 + col)
+                row, col = row + row_step, col + col_step
+            table.append(ray)
+        rays.append(table)
+    return knight, king, pawn, rays
+
+
+KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, RAYS = _build_attack_tables()
+NORTH, EAST, NORTH_EAST, NORTH_WEST, SOUTH, WEST, SOUTH_WEST, SOUTH_EAST = range(8)
+
+# Castling rights that survive a move touching each square
+CASTLING_MASKS = [15] * 64
+CASTLING_MASKS[0] = 15 & ~CASTLE_WHITE_QUEEN
+CASTLING_MASKS[4] = 15 & ~(CASTLE_WHITE_KING | CASTLE_WHITE_QUEEN)
+CASTLING_MASKS[7] = 15 & ~CASTLE_WHITE_KING
+CASTLING_MASKS[56] = 15 & ~CASTLE_BLACK_QUEEN
+CASTLING_MASKS[60] = 15 & ~(CASTLE_BLACK_KING | CASTLE_BLACK_QUEEN)
+CASTLING_MASKS[63] = 15 & ~CASTLE_BLACK_KING
+
+
+def _build_zobrist_keys():
+    # Fixed seed so hashes agree across processes and runs (opening books, worker pools)
+    rng = random.Random(0x5A0B7157)
+    pieces = [[rng.getrandbits(64) for _ in range(64)] for _ in range(12)]
+    castling = [rng.getrandbits(64) for _ in range(16)]
+    castling[0] = 0
+    en_passant = [rng.getrandbits(64) for _ in range(8)]
+    return pieces, castling, en_passant, rng.getrandbits(64)
+
+
+ZOBRIST_PIECES, ZOBRIST_CASTLING, ZOBRIST_EN_PASSANT, ZOBRIST_BLACK_TO_MOVE = _build_zobrist_keys()
+
+
+def _slide(square, occupancy, positive_directions, negative_directions):
+    attacks = 0
+    for direction in positive_directions:
+        ray = RAYS[direction][square]
+        blockers = ray & occupancy
+        if blockers:
+            ray ^= RAYS[direction][(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for direction in negative_directions:
+        ray = RAYS[direction][square]
+        blockers = ray & occupancy
+        if blockers:
+            ray ^= RAYS[direction][blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(square, occupancy):
+    return _slide(square, occupancy, (NORTH, EAST), (SOUTH, WEST))
+
+
+def bishop_attacks(square, occupancy):
+    return _slide(square, occupancy, (NORTH_EAST, NORTH_WEST), (SOUTH_WEST, SOUTH_EAST))
+
+
+class BitboardPosition:
+    PIECE_TYPES = None  # Filled in below once the Piece classes exist
+
     def __init__(self):
+        self.pieces = [0] * 12  # One bitboard per color and piece type, indexed color * 6 + piece type
+        self.occupancy = [0, 0]
+        self.mailbox = [-1] * 64  # Piece index on each square, -1 when empty
+        self.king_squares = [-1, -1]
+        self.side_to_move = WHITE_INDEX
+        self.castling_rights = 0
+        self.en_passant_square = -1
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.hash = 0  # Zobrist hash, updated incrementally by every mutation
+        self.history = []  # Undo stack: (move, captured piece, castling rights, en passant square, halfmove clock, hash)
+
+    @classmethod
+    def starting_position(cls):
+        position = cls()
+        back_rank = [ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK]
+        for col, piece_type in enumerate(back_rank):
+            position.put_piece(col, piece_type)
+            position.put_piece(8 + col, PAWN)
+            position.put_piece(48 + col, 6 + PAWN)
+            position.put_piece(56 + col, 6 + piece_type)
+        position.castling_rights = CASTLE_WHITE_KING | CASTLE_WHITE_QUEEN | CASTLE_BLACK_KING | CASTLE_BLACK_QUEEN
+        position.hash = position.compute_hash()
+        return position
+
+    @classmethod
+    def from_board(cls, board, side_to_move=None):
+        # Castling rights are inferred from kings and rooks still standing on their home squares
+        position = cls()
+        for row in range(8):
+            for col in range(8):
+                piece = board.get_piece(row, col)
+                if piece is not None:
+                    position.put_piece(row * 8 + col, COLOR_INDEX[piece.color] * 6 + cls.PIECE_TYPES[type(piece)])
+        position.side_to_move = BLACK_INDEX if side_to_move == Color.BLACK else WHITE_INDEX
+        for king_square, rook_square, right, piece_offset in ((4, 7, CASTLE_WHITE_KING, 0), (4, 0, CASTLE_WHITE_QUEEN, 0),
+                                                               (60, 63, CASTLE_BLACK_KING, 6), (60, 56, CASTLE_BLACK_QUEEN, 6)):
+            if position.mailbox[king_square] == piece_offset + KING and position.mailbox[rook_square] == piece_offset + ROOK:
+                position.castling_rights |= right
+        position.hash = position.compute_hash()
+        return position
+
+    @classmethod
+    def from_fen(cls, fen):
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"Invalid FEN: {fen}")
+        placement, side, castling, en_passant = fields[:4]
+        ranks = placement.split("/")
+        if len(ranks) != 8 or side not in ("w", "b"):
+            raise ValueError(f"Invalid FEN: {fen}")
+        position = cls()
+        for index, rank in enumerate(ranks):
+            row = 7 - index
+            col = 0
+            for char in rank:
+                if char.isdigit():
+                    col += int(char)
+                elif char in PIECE_SYMBOLS and col < 8:
+                    position.put_piece(row * 8 + col, PIECE_SYMBOLS.index(char))
+                    col += 1
+                else:
+                    raise ValueError(f"Invalid FEN: {fen}")
+            if col != 8:
+                raise ValueError(f"Invalid FEN: {fen}")
+        position.side_to_move = WHITE_INDEX if side == "w" else BLACK_INDEX
+        for char in castling.replace("-", ""):
+            if char not in "KQkq":
+                raise ValueError(f"Invalid FEN: {fen}")
+            position.castling_rights |= 1 << "KQkq".index(char)
+        position.en_passant_square = -1 if en_passant == "-" else parse_square(en_passant)
+        if len(fields) >= 6:
+            position.halfmove_clock = int(fields[4])
+            position.fullmove_number = int(fields[5])
+        position.hash = position.compute_hash()
+        return position
+
+    def to_fen(self):
+        ranks = []
+        for row in range(7, -1, -1):
+            rank = ""
+            empty = 0
+            for col in range(8):
+                piece = self.mailbox[row * 8 + col]
+                if piece < 0:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += PIECE_SYMBOLS[piece]
+            ranks.append(rank + (str(empty) if empty else ""))
+        castling = "".join(char for bit, char in enumerate("KQkq") if self.castling_rights >> bit & 1) or "-"
+        en_passant = square_name(self.en_passant_square) if self.en_passant_square >= 0 else "-"
+        return f"{'/'.join(ranks)} {'wb'[self.side_to_move]} {castling} {en_passant} " \
+               f"{self.halfmove_clock} {self.fullmove_number}"
+
+    def compute_hash(self):
+        # Full recomputation; make_move and unmake_move keep self.hash current incrementally
+        key = 0
+        for square, piece in enumerate(self.mailbox):
+            if piece >= 0:
+                key ^= ZOBRIST_PIECES[piece][square]
+        key ^= ZOBRIST_CASTLING[self.castling_rights]
+        if self.en_passant_square >= 0:
+            key ^= ZOBRIST_EN_PASSANT[self.en_passant_square & 7]
+        if self.side_to_move == BLACK_INDEX:
+            key ^= ZOBRIST_BLACK_TO_MOVE
+        return key
+
+    def put_piece(self, square, piece):
+        bit = 1 << square
+        self.pieces[piece] |= bit
+        self.occupancy[piece // 6] |= bit
+        self.mailbox[square] = piece
+        self.hash ^= ZOBRIST_PIECES[piece][square]
+        if piece % 6 == KING:
+            self.king_squares[piece // 6] = square
+
+    def remove_piece(self, square):
+        piece = self.mailbox[square]
+        if piece >= 0:
+            mask = ~(1 << square)
+            self.pieces[piece] &= mask
+            self.occupancy[piece // 6] &= mask
+            self.mailbox[square] = -1
+            self.hash ^= ZOBRIST_PIECES[piece][square]
+            if piece % 6 == KING:
+                self.king_squares[piece // 6] = -1
+        return piece
+
+    def _attacked(self, square, by_color, occupancy, excluded=0):
+        # True if by_color attacks square given an occupancy; excluded masks out captured attackers
+        pieces = self.pieces
+        base = by_color * 6
+        keep = ~excluded
+        if PAWN_ATTACKS[1 - by_color][square] & pieces[base + PAWN] & keep:
+            return True
+        if KNIGHT_ATTACKS[square] & pieces[base + KNIGHT] & keep:
+            return True
+        if KING_ATTACKS[square] & pieces[base + KING]:
+            return True
+        queens = pieces[base + QUEEN]
+        diagonal = (pieces[base + BISHOP] | queens) & keep
+        if diagonal and bishop_attacks(square, occupancy) & diagonal:
+            return True
+        straight = (pieces[base + ROOK] | queens) & keep
+        return bool(straight and rook_attacks(square, occupancy) & straight)
+
+    def is_square_attacked(self, square, by_color):
+        return self._attacked(square, by_color, self.occupancy[0] | self.occupancy[1])
+
+    def in_check(self, color=None):
+        color = self.side_to_move if color is None else color
+        king_square = self.king_squares[color]
+        return king_square >= 0 and self.is_square_attacked(king_square, 1 - color)
+
+    def _pseudo_legal_moves(self, color):
+        them = 1 - color
+        own = self.occupancy[color]
+        enemy = self.occupancy[them]
+        occupied = own | enemy
+        empty = ~occupied & FULL_BOARD
+        base = color * 6
+        mailbox = self.mailbox
+
+        # Pawns
+        forward, start_row, promotion_row = (8, 1, 7) if color == WHITE_INDEX else (-8, 6, 0)
+        pawns = self.pieces[base + PAWN]
+        while pawns:
+            low = pawns & -pawns
+            square = low.bit_length() - 1
+            pawns ^= low
+            target = square + forward
+            if empty >> target & 1:
+                if target >> 3 == promotion_row:
+                    for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        yield encode_move(square, target, promotion)
+                else:
+                    yield encode_move(square, target)
+                    if square >> 3 == start_row and empty >> (target + forward) & 1:
+                        yield encode_move(square, target + forward, 0, FLAG_DOUBLE_PUSH)
+            attacks = PAWN_ATTACKS[color][square]
+            captures = attacks & enemy
+            while captures:
+                low_target = captures & -captures
+                target = low_target.bit_length() - 1
+                captures ^= low_target
+                if target >> 3 == promotion_row:
+                    for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        yield encode_move(square, target, promotion, FLAG_CAPTURE)
+                else:
+                    yield encode_move(square, target, 0, FLAG_CAPTURE)
+            # The en passant square belongs to the side to move; the other side never has that capture
+            if color == self.side_to_move and self.en_passant_square >= 0 and attacks >> self.en_passant_square & 1:
+                yield encode_move(square, self.en_passant_square, 0, FLAG_CAPTURE | FLAG_EN_PASSANT)
+
+        # Knights, sliders and king
+        for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            pieces = self.pieces[base + piece_type]
+            while pieces:
+                low = pieces & -pieces
+                square = low.bit_length() - 1
+                pieces ^= low
+                if piece_type == KNIGHT:
+                    targets = KNIGHT_ATTACKS[square]
+                elif piece_type == BISHOP:
+                    targets = bishop_attacks(square, occupied)
+                elif piece_type == ROOK:
+                    targets = rook_attacks(square, occupied)
+                elif piece_type == QUEEN:
+                    targets = bishop_attacks(square, occupied) | rook_attacks(square, occupied)
+                else:
+                    targets = KING_ATTACKS[square]
+                targets &= ~own
+                while targets:
+                    low_target = targets & -targets
+                    target = low_target.bit_length() - 1
+                    targets ^= low_target
+                    yield encode_move(square, target, 0, FLAG_CAPTURE if mailbox[target] >= 0 else 0)
+
+        # Castling: the king may not start in, pass through or land on an attacked square
+        rights = self.castling_rights
+        if color == WHITE_INDEX:
+            king_side, queen_side, home = CASTLE_WHITE_KING, CASTLE_WHITE_QUEEN, 4
+        else:
+            king_side, queen_side, home = CASTLE_BLACK_KING, CASTLE_BLACK_QUEEN, 60
+        if rights & (king_side | queen_side) and self.king_squares[color] == home and not self._attacked(home, them, occupied):
+            if rights & king_side and mailbox[home + 3] == base + ROOK and not occupied & (0b11 << (home + 1)) \
+                    and not self._attacked(home + 1, them, occupied) and not self._attacked(home + 2, them, occupied):
+                yield encode_move(home, home + 2, 0, FLAG_CASTLE)
+            if rights & queen_side and mailbox[home - 4] == base + ROOK and not occupied & (0b111 << (home - 3)) \
+                    and not self._attacked(home - 1, them, occupied) and not self._attacked(home - 2, them, occupied):
+                yield encode_move(home, home - 2, 0, FLAG_CASTLE)
+
+    def is_legal(self, move, color=None):
+        # Checks a pseudo-legal move for king safety without mutating the position
+        color = self.side_to_move if color is None else color
+        flags = move_flags(move)
+        if flags & FLAG_CASTLE:
+            return True  # Attacked squares were already checked during generation
+        from_square = move_from(move)
+        to_square = move_to(move)
+        occupied = self.occupancy[0] | self.occupancy[1]
+        occupied = (occupied & ~(1 << from_square)) | (1 << to_square)
+        captured = 1 << to_square
+        if flags & FLAG_EN_PASSANT:
+            captured_square = to_square - 8 if color == WHITE_INDEX else to_square + 8
+            captured = 1 << captured_square
+            occupied &= ~captured
+        king_square = to_square if self.mailbox[from_square] % 6 == KING else self.king_squares[color]
+        return not self._attacked(king_square, 1 - color, occupied, captured)
+
+    def make_move(self, move):
+        # Applies a legal move in place; unmake_move restores the previous state exactly
+        from_square = move_from(move)
+        to_square = move_to(move)
+        promotion = move_promotion(move)
+        flags = move_flags(move)
+        color = self.side_to_move
+        captured_square = to_square
+        if flags & FLAG_EN_PASSANT:
+            captured_square = to_square - 8 if color == WHITE_INDEX else to_square + 8
+        self.history.append((move, self.mailbox[captured_square], self.castling_rights, self.en_passant_square,
+                             self.halfmove_clock, self.hash))
+        captured = self.remove_piece(captured_square)
+
+        piece = self.remove_piece(from_square)
+        self.put_piece(to_square, color * 6 + promotion if promotion else piece)
+        if flags & FLAG_CASTLE:
+            if to_square > from_square:
+                self.put_piece(from_square + 1, self.remove_piece(from_square + 3))
+            else:
+                self.put_piece(from_square - 1, self.remove_piece(from_square - 4))
+
+        key = self.hash ^ ZOBRIST_CASTLING[self.castling_rights] ^ ZOBRIST_BLACK_TO_MOVE
+        if self.en_passant_square >= 0:
+            key ^= ZOBRIST_EN_PASSANT[self.en_passant_square & 7]
+        self.castling_rights &= CASTLING_MASKS[from_square] & CASTLING_MASKS[to_square]
+        self.en_passant_square = (from_square + to_square) >> 1 if flags & FLAG_DOUBLE_PUSH else -1
+        key ^= ZOBRIST_CASTLING[self.castling_rights]
+        if self.en_passant_square >= 0:
+            key ^= ZOBRIST_EN_PASSANT[self.en_passant_square & 7]
+        self.hash = key
+        self.halfmove_clock = 0 if captured >= 0 or piece % 6 == PAWN else self.halfmove_clock + 1
+        if color == BLACK_INDEX:
+            self.fullmove_number += 1
+        self.side_to_move = 1 - color
+
+    def unmake_move(self):
+        move, captured, castling_rights, en_passant_square, halfmove_clock, key = self.history.pop()
+        from_square = move_from(move)
+        to_square = move_to(move)
+        flags = move_flags(move)
+        color = 1 - self.side_to_move
+        self.side_to_move = color
+        if color == BLACK_INDEX:
+            self.fullmove_number -= 1
+
+        piece = self.remove_piece(to_square)
+        self.put_piece(from_square, color * 6 + PAWN if move_promotion(move) else piece)
+        if flags & FLAG_CASTLE:
+            if to_square > from_square:
+                self.put_piece(from_square + 3, self.remove_piece(from_square + 1))
+            else:
+                self.put_piece(from_square - 4, self.remove_piece(from_square - 1))
+        if captured >= 0:
+            if flags & FLAG_EN_PASSANT:
+                self.put_piece(to_square - 8 if color == WHITE_INDEX else to_square + 8, captured)
+            else:
+                self.put_piece(to_square, captured)
+
+        self.castling_rights = castling_rights
+        self.en_passant_square = en_passant_square
+        self.halfmove_clock = halfmove_clock
+        self.hash = key
+
+    def is_repetition(self):
+        # True if this position already occurred since the last capture or pawn move
+        key = self.hash
+        history = self.history
+        for index in range(len(history) - 2, max(len(history) - self.halfmove_clock, 0) - 1, -2):
+            if history[index][5] == key:
+                return True
+        return False
+
+    def iter_legal_moves(self, color=None):
+        color = self.side_to_move if color is None else color
+        for move in self._pseudo_legal_moves(color):
+            if self.is_legal(move, color):
+                yield move
+
+    def generate_legal_moves(self, color=None):
+        return list(self.iter_legal_moves(color))
+
+    def has_legal_move(self, color=None):
+        for _ in self.iter_legal_moves(color):
+            return True
+        return False
+
+
+class TranspositionTable:
+    # Fixed-size hash table over two preallocated 64-bit arrays: full keys and packed entries.
+    # Entry layout: move (20 bits) | score + 2^16 (17 bits) | depth (8 bits) | bound (2 bits) | age (8 bits)
+    EXACT = 0
+    LOWER_BOUND = 1
+    UPPER_BOUND = 2
+
+    def __init__(self, size=1 << 18):
+        if size & (size - 1):
+            raise ValueError("Transposition table size must be a power of two")
+        self.size = size
+        self.mask = size - 1
+        self.keys = array("Q", bytes(8 * size))
+        self.entries = array("Q", bytes(8 * size))
+        self.age = 0
+        self.hits = 0
+        self.probes = 0
+
+    def new_search(self):
+        # Entries from earlier searches become preferred replacement victims
+        self.age = (self.age + 1) & 0xFF
+
+    def clear(self):
+        self.keys = array("Q", bytes(8 * self.size))
+        self.entries = array("Q", bytes(8 * self.size))
+        self.age = 0
+
+    def probe(self, key):
+        # Returns (depth, score, bound, move) or None
+        self.probes += 1
+        index = key & self.mask
+        if self.keys[index] != key:
+            return None
+        self.hits += 1
+        entry = self.entries[index]
+        return (entry >> 37) & 0xFF, ((entry >> 20) & 0x1FFFF) - 65536, (entry >> 45) & 3, entry & 0xFFFFF
+
+    def store(self, key, depth, score, bound, move=0):
+        # Replace unless the slot holds a deeper result for a different position from the current search
+        index = key & self.mask
+        stored = self.entries[index]
+        if stored and self.keys[index] != key and (stored >> 47) == self.age and (stored >> 37) & 0xFF > depth:
+            return
+        if not move and self.keys[index] == key:
+            move = stored & 0xFFFFF  # Keep the best move from a shallower search of the same position
+        self.keys[index] = key
+        self.entries[index] = move | ((score + 65536) << 20) | (depth << 37) | (bound << 45) | (self.age << 47)
+
+    def usage(self):
+        # Fraction of slots filled, sampled over the first thousand
+        sample = min(self.size, 1000)
+        return sum(1 for index in range(sample) if self.entries[index]) / sample
+
+
+# search.py
+PIECE_VALUES = [100, 320, 330, 500, 900, 0]
+
+# Piece-square tables written from White's point of view with rank 8 first, as they read on a diagram
+PIECE_SQUARE_TABLES = [
+    [0, 0, 0, 0, 0, 0, 0, 0,
+     50, 50, 50, 50, 50, 50, 50, 50,
+     10, 10, 20, 30, 30, 20, 10, 10,
+     5, 5, 10, 25, 25, 10, 5, 5,
+     0, 0, 0, 20, 20, 0, 0, 0,
+     5, -5, -10, 0, 0, -10, -5, 5,
+     5, 10, 10, -20, -20, 10, 10, 5,
+     0, 0, 0, 0, 0, 0, 0, 0],
+    [-50, -40, -30, -30, -30, -30, -40, -50,
+     -40, -20, 0, 0, 0, 0, -20, -40,
+     -30, 0, 10, 15, 15, 10, 0, -30,
+     -30, 5, 15, 20, 20, 15, 5, -30,
+     -30, 0, 15, 20, 20, 15, 0, -30,
+     -30, 5, 10, 15, 15, 10, 5, -30,
+     -40, -20, 0, 5, 5, 0, -20, -40,
+     -50, -40, -30, -30, -30, -30, -40, -50],
+    [-20, -10, -10, -10, -10, -10, -10, -20,
+     -10, 0, 0, 0, 0, 0, 0, -10,
+     -10, 0, 5, 10, 10, 5, 0, -10,
+     -10, 5, 5, 10, 10, 5, 5, -10,
+     -10, 0, 10, 10, 10, 10, 0, -10,
+     -10, 10, 10, 10, 10, 10, 10, -10,
+     -10, 5, 0, 0, 0, 0, 5, -10,
+     -20, -10, -10, -10, -10, -10, -10, -20],
+    [0, 0, 0, 0, 0, 0, 0, 0,
+     5, 10, 10, 10, 10, 10, 10, 5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     0, 0, 0, 5, 5, 0, 0, 0],
+    [-20, -10, -10, -5, -5, -10, -10, -20,
+     -10, 0, 0, 0, 0, 0, 0, -10,
+     -10, 0, 5, 5, 5, 5, 0, -10,
+     -5, 0, 5, 5, 5, 5, 0, -5,
+     0, 0, 5, 5, 5, 5, 0, -5,
+     -10, 5, 5, 5, 5, 5, 0, -10,
+     -10, 0, 5, 0, 0, 0, 0, -10,
+     -20, -10, -10, -5, -5, -10, -10, -20],
+    [-30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -20, -30, -30, -40, -40, -30, -30, -20,
+     -10, -20, -20, -20, -20, -20, -20, -10,
+     20, 20, 0, 0, 0, 0, 20, 20,
+     20, 30, 10, 0, 0, 10, 30, 20],
+]
+
+# Combined material + placement score per piece index and square, from White's point of view
+PIECE_SQUARE_SCORES = [
+    [PIECE_VALUES[piece % 6] + PIECE_SQUARE_TABLES[piece % 6][(7 - (square >> 3)) * 8 + (square & 7)] if piece < 6
+     else -(PIECE_VALUES[piece % 6] + PIECE_SQUARE_TABLES[piece % 6][square])
+     for square in range(64)]
+    for piece in range(12)
+]
+
+
+def evaluate(position):
+    # Static evaluation in centipawns from the side to move's point of view
+    score = 0
+    for square, piece in enumerate(position.mailbox):
+        if piece >= 0:
+            score += PIECE_SQUARE_SCORES[piece][square]
+    return score if position.side_to_move == WHITE_INDEX else -score
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchEngine:
+    MATE_SCORE = 30000
+    INFINITY = 32000
+    MAX_PLY = 64
+
+    def __init__(self, transposition_table=None):
+        self.tt = transposition_table or TranspositionTable()
+        self.killers = [[0, 0] for _ in range(self.MAX_PLY)]
+        self.nodes = 0
+        self.deadline = None
+        self.best_root_move = 0
+        self.root_moves = None
+
+    def search(self, position, time_limit=1.0, max_depth=None, root_moves=None):
+        # Iterative deepening; returns (best move, score, completed depth) for the side to move.
+        # root_moves restricts the search to a subset of the legal moves, as used by parallel root splitting.
+        self.nodes = 0
+        self.deadline = time.perf_counter() + time_limit if time_limit else None
+        self.killers = [[0, 0] for _ in range(self.MAX_PLY)]
+        self.root_moves = root_moves
+        self.tt.new_search()
+        legal_moves = root_moves or position.generate_legal_moves()
+        if not legal_moves:
+            return 0, -self.MATE_SCORE if position.in_check() else 0, 0
+        best_move, best_score, completed_depth = legal_moves[0], 0, 0
+        history_length = len(position.history)
+        for depth in range(1, (max_depth or self.MAX_PLY - 1) + 1):
+            self.best_root_move = 0
+            try:
+                score = self._negamax(position, depth, -self.INFINITY, self.INFINITY, 0)
+            except SearchTimeout:
+                while len(position.history) > history_length:
+                    position.unmake_move()
+                break
+            best_move, best_score, completed_depth = self.best_root_move or best_move, score, depth
+            if abs(score) >= self.MATE_SCORE - self.MAX_PLY:
+                break  # A forced mate was found; deeper searches cannot improve on it
+        return best_move, best_score, completed_depth
+
+    def _negamax(self, position, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 1023 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if ply and (position.halfmove_clock >= 100 or position.is_repetition()):
+            return 0
+
+        in_check = position.in_check()
+        if in_check:
+            depth += 1  # Check extension
+        if depth <= 0 or ply >= self.MAX_PLY - 1:
+            return self._quiescence(position, alpha, beta, ply)
+
+        original_alpha = alpha
+        entry = self.tt.probe(position.hash)
+        tt_move = 0
+        if entry is not None:
+            entry_depth, entry_score, bound, tt_move = entry
+            if ply and entry_depth >= depth:
+                entry_score = self._score_from_tt(entry_score, ply)
+                if bound == TranspositionTable.EXACT or \
+                        (bound == TranspositionTable.LOWER_BOUND and entry_score >= beta) or \
+                        (bound == TranspositionTable.UPPER_BOUND and entry_score <= alpha):
+                    return entry_score
+
+        moves = self.root_moves if ply == 0 and self.root_moves else position.generate_legal_moves()
+        if not moves:
+            return -self.MATE_SCORE + ply if in_check else 0
+
+        best_score = -self.INFINITY
+        best_move = 0
+        for move in self._order_moves(position, moves, tt_move, ply):
+            position.make_move(move)
+            score = -self._negamax(position, depth - 1, -beta, -alpha, ply + 1)
+            position.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if ply == 0:
+                    self.best_root_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not move_flags(move) & FLAG_CAPTURE and move != self.killers[ply][0]:
+                    self.killers[ply][1] = self.killers[ply][0]
+                    self.killers[ply][0] = move
+                break
+
+        if best_score <= original_alpha:
+            bound = TranspositionTable.UPPER_BOUND
+        elif best_score >= beta:
+            bound = TranspositionTable.LOWER_BOUND
+        else:
+            bound = TranspositionTable.EXACT
+        if ply or not self.root_moves:  # A root score over a subset of moves is not the position's score
+            self.tt.store(position.hash, depth, self._score_to_tt(best_score, ply), bound, best_move)
+        return best_score
+
+    def _quiescence(self, position, alpha, beta, ply):
+        # Resolve captures so the static evaluation is not taken in the middle of an exchange
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 1023 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        stand_pat = evaluate(position)
+        if stand_pat >= beta or ply >= self.MAX_PLY - 1:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        captures = [move for move in position.iter_legal_moves() if move_flags(move) & FLAG_CAPTURE or move_promotion(move)]
+        for move in self._order_moves(position, captures, 0, ply):
+            position.make_move(move)
+            score = -self._quiescence(position, -beta, -alpha, ply + 1)
+            position.unmake_move()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def _order_moves(self, position, moves, tt_move, ply):
+        # TT move first, then captures by MVV-LVA, then killer moves, then quiet moves
+        mailbox = position.mailbox
+        killers = self.killers[ply]
+        scored = []
+        for move in moves:
+            if move == tt_move:
+                score = 1000000
+            elif move_flags(move) & FLAG_CAPTURE:
+                victim = PAWN if move_flags(move) & FLAG_EN_PASSANT else mailbox[move_to(move)] % 6
+                score = 100000 + PIECE_VALUES[victim] * 10 - PIECE_VALUES[mailbox[move_from(move)] % 6] // 10
+            elif move_promotion(move):
+                score = 90000 + move_promotion(move)
+            elif move == killers[0]:
+                score = 80000
+            elif move == killers[1]:
+                score = 70000
+            else:
+                score = 0
+            scored.append((score, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
+
+    def _score_to_tt(self, score, ply):
+        # Mate scores are stored relative to the node so they stay valid at other plies
+        if score >= self.MATE_SCORE - self.MAX_PLY:
+            return score + ply
+        if score <= -self.MATE_SCORE + self.MAX_PLY:
+            return score - ply
+        return score
+
+    def _score_from_tt(self, score, ply):
+        if score >= self.MATE_SCORE - self.MAX_PLY:
+            return score - ply
+        if score <= -self.MATE_SCORE + self.MAX_PLY:
+            return score + ply
+        return score
+
+
+BitboardPosition.PIECE_TYPES = {Pawn: PAWN, Knight: KNIGHT, Bishop: BISHOP, Rook: ROOK, Queen: QUEEN, King: KING}
+COLOR_INDEX = {Color.WHITE: WHITE_INDEX, Color.BLACK: BLACK_INDEX}
+PROMOTION_PIECES = {KNIGHT: Knight, BISHOP: Bishop, ROOK: Rook, QUEEN: Queen}
+PIECE_CLASSES = [Pawn, Knight, Bishop, Rook, Queen, King]
+
+
+class Board:
+    def __init__(self, fen=None):
         self.board = [[None] * 8 for _ in range(8)]
-        self._initialize_board()
+        if fen is None:
+            self._initialize_board()
+            self.position = BitboardPosition.from_board(self)
+        else:
+            self.position = BitboardPosition.from_fen(fen)
+            self._load_position()
+        self.undo_stack = []
+
+    @classmethod
+    def from_fen(cls, fen):
+        return cls(fen)
+
+    def to_fen(self):
+        return self.position.to_fen()
+
+    def _load_position(self):
+        # Builds the piece grid from the bitboard position
+        for square, piece in enumerate(self.position.mailbox):
+            if piece >= 0:
+                row, col = divmod(square, 8)
+                color = Color.WHITE if piece < 6 else Color.BLACK
+                self.board[row][col] = PIECE_CLASSES[piece % 6](color, row, col)
 
     def _initialize_board(self):
         # Initialize white pieces
@@ -98,127 +910,157 @@ class Board:
 
     def set_piece(self, row, col, piece):
         self.board[row][col] = piece
+        # Keep the bitboard mirror in sync
+        square = row * 8 + col
+        self.position.remove_piece(square)
+        if piece is not None:
+            self.position.put_piece(square, COLOR_INDEX[piece.color] * 6 + BitboardPosition.PIECE_TYPES[type(piece)])
 
-    def is_valid_move(self, piece, dest_row, dest_col):
+    def is_valid_move(self, piece, dest_row, dest_col, promotion=None):
+        return self._find_legal_move(piece, dest_row, dest_col, promotion) is not None
+
+    def _find_legal_move(self, piece, dest_row, dest_col, promotion=None):
+        # Returns the encoded legal move matching a Piece-level move, or None
         if piece is None or dest_row < 0 or dest_row > 7 or dest_col < 0 or dest_col > 7:
-            return False
-        dest_piece = self.board[dest_row][dest_col]
-        return (dest_piece is None or dest_piece.color != piece.color) and \
-               piece.can_move(self, dest_row, dest_col)
+            return None
+        if self.board[piece.row][piece.col] is not piece:
+            return None  # Stale piece object no longer standing on its recorded square
+        from_square = piece.row * 8 + piece.col
+        to_square = dest_row * 8 + dest_col
+        promotion_type = BitboardPosition.PIECE_TYPES[promotion] if promotion else QUEEN
+        for move in self.position.iter_legal_moves(COLOR_INDEX[piece.color]):
+            if move_from(move) == from_square and move_to(move) == to_square and \
+                    move_promotion(move) in (0, promotion_type):
+                return move
+        return None
 
-    def is_checkmate(self, color):
-        # Check if the king of the given color is in check
-        king = None
-        for row in range(8):
-            for col in range(8):
-                piece = self.get_piece(row, col)
-                if isinstance(piece, King) and piece.color == color:
-                    king = piece
-                    break
-        if king is None or not self.is_in_check(color):
-            return False
+    def make_move(self, move):
+        if move.piece is not None and COLOR_INDEX[move.piece.color] != self.position.side_to_move:
+            raise ValueError("Not this color's turn!")
+        encoded = self._find_legal_move(move.piece, move.dest_row, move.dest_col, move.promotion)
+        if encoded is None:
+            raise ValueError("Invalid move!")
+        piece = move.piece
+        source_row, source_col = piece.row, piece.col
+        dest_row, dest_col = move.dest_row, move.dest_col
+        flags = move_flags(encoded)
+        captured_row = source_row if flags & FLAG_EN_PASSANT else dest_row
+        captured = self.board[captured_row][dest_col]
+        self.position.make_move(encoded)
 
-        # Check if there are any valid moves for the player
-        for row in range(8):
-            for col in range(8):
-                piece = self.get_piece(row, col)
-                if piece and piece.color == color:
-                    for r in range(8):
-                        for c in range(8):
-                            if self.is_valid_move(piece, r, c):
-                                # Temporarily make the move
-                                original_piece = self.get_piece(r, c)
-                                self.set_piece(r, c, piece)
-                                self.set_piece(row, col, None)
-                                if not self.is_in_check(color):
-                                    # Undo the move
-                                    self.set_piece(row, col, piece)
-                                    self.set_piece(r, c, original_piece)
-                                    return False
-                                # Undo the move
-                                self.set_piece(row, col, piece)
-                                self.set_piece(r, c, original_piece)
-        return True
+        # Mirror the move on the piece grid without going through set_piece
+        self.board[captured_row][dest_col] = None
+        self.board[source_row][source_col] = None
+        placed = piece
+        if move_promotion(encoded):
+            placed = PROMOTION_PIECES[move_promotion(encoded)](piece.color, dest_row, dest_col)
+        self.board[dest_row][dest_col] = placed
+        piece.row, piece.col = dest_row, dest_col
+        rook_cols = None
+        if flags & FLAG_CASTLE:
+            rook_cols = (7, 5) if dest_col > source_col else (0, 3)
+            rook = self.board[source_row][rook_cols[0]]
+            self.board[source_row][rook_cols[0]] = None
+            self.board[source_row][rook_cols[1]] = rook
+            rook.col = rook_cols[1]
+        self.undo_stack.append((piece, source_row, source_col, placed, captured, captured_row, rook_cols))
+
+    def unmake_move(self):
+        piece, source_row, source_col, placed, captured, captured_row, rook_cols = self.undo_stack.pop()
+        self.position.unmake_move()
+        dest_row, dest_col = placed.row, placed.col
+        self.board[dest_row][dest_col] = None
+        if captured is not None:
+            self.board[captured_row][dest_col] = captured
+        self.board[source_row][source_col] = piece
+        piece.row, piece.col = source_row, source_col
+        if rook_cols is not None:
+            rook = self.board[source_row][rook_cols[1]]
+            self.board[source_row][rook_cols[1]] = None
+            self.board[source_row][rook_cols[0]] = rook
+            rook.col = rook_cols[0]
+
+    def has_legal_move(self, color):
+        # Stops at the first legal move instead of enumerating them all
+        return self.position.has_legal_move(COLOR_INDEX[color])
+
+    def is_checkmate(self, color):
+        return self.is_in_check(color) and not self.has_legal_move(color)
 
     def is_stalemate(self, color):
-        # If the player is not in check, check for valid moves
-        if not self.is_in_check(color):
-            for row in range(8):
-                for col in range(8):
-                    piece = self.get_piece(row, col)
-                    if piece and piece.color == color:
-                        for r in range(8):
-                            for c in range(8):
-                                if self.is_valid_move(piece, r, c):
-                                    return False
-            return True
-        return False
+        return not self.is_in_check(color) and not self.has_legal_move(color)
 
     def is_in_check(self, color):
-        # Check if the king of the given color is in check
-        king = None
-        for row in range(8):
-            for col in range(8):
-                piece = self.get_piece(row, col)
-                if isinstance(piece, King) and piece.color == color:
-                    king = piece
-                    break
-        if king is None:
-            return False
-
-        # Check if any opponent's piece can attack the king
-        for row in range(8):
-            for col in range(8):
-                piece = self.get_piece(row, col)
-                if piece and piece.color != color and piece.can_move(self, king.row, king.col):
-                    return True
-        return False
+        # King squares are tracked incrementally, so this is a single attack lookup
+        return self.position.in_check(COLOR_INDEX[color])
 
 
 class Player:
     def __init__(self, color):
         self.color = color
 
+    def choose_move(self, board):
+        # Human players return None and are prompted for input by the game
+        return None
+
     def make_move(self, board, move):
-        piece = move.piece
-        dest_row = move.dest_row
-        dest_col = move.dest_col
-
-        if board.is_valid_move(piece, dest_row, dest_col):
-            source_row = piece.row
-            source_col = piece.col
-            board.set_piece(source_row, source_col, None)
-            board.set_piece(dest_row, dest_col, piece)
-            piece.row = dest_row
-            piece.col = dest_col
+        board.make_move(move)
+
+
+class EnginePlayer(Player):
+    def __init__(self, color, time_limit=1.0, max_depth=None, engine=None, opening_book=None):
+        super().__init__(color)
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.engine = engine or SearchEngine()
+        self.opening_book = opening_book
+        self.last_score = 0
+        self.last_depth = 0
+
+    def choose_move(self, board):
+        move = self.opening_book.choose_move(board.position) if self.opening_book else None
+        if move is not None:
+            self.last_score, self.last_depth = 0, 0  # Book move, no search
         else:
-            raise ValueError("Invalid move!")
+            move, self.last_score, self.last_depth = self.engine.search(board.position, self.time_limit,
+                                                                        self.max_depth)
+        from_square = move_from(move)
+        piece = board.get_piece(from_square >> 3, from_square & 7)
+        promotion = PROMOTION_PIECES[move_promotion(move)] if move_promotion(move) else None
+        return Move(piece, move_to(move) >> 3, move_to(move) & 7, promotion)
+
 
-        
 class Move:
-    def __init__(self, piece, dest_row, dest_col):
+    def __init__(self, piece, dest_row, dest_col, promotion=None):
         self.piece = piece
         self.dest_row = dest_row
         self.dest_col = dest_col
+        self.promotion = promotion  # Piece class to promote to; pawns default to a Queen
 
 
 class Game:
-    def __init__(self):
-        self.board = Board()
-        self.players = [Player(Color.WHITE), Player(Color.BLACK)]
-        self.current_player = 0
+    def __init__(self, players=None, verbose=True, fen=None):
+        self.board = Board(fen)
+        self.start_fen = self.board.to_fen()
+        self.players = players or [Player(Color.WHITE), Player(Color.BLACK)]
+        self.verbose = verbose
+        self.current_player = self.board.position.side_to_move
+        self.position_counts = {}  # Zobrist hash -> occurrences, for threefold repetition
+        self._record_position()
 
     def start(self):
         # Game loop
         while not self._is_game_over():
             player = self.players[self.current_player]
-            print(f"{player.color.name}'s turn.")
+            if self.verbose:
+                print(f"{player.color.name}'s turn.")
 
             # Get move from the player
             move = self._get_player_move(player)
 
             # Make the move on the board
             player.make_move(self.board, move)
+            self._record_position()
 
             # Switch to the next player
             self.current_player = (self.current_player + 1) % 2
@@ -226,11 +1068,26 @@ class Game:
         # Display game result
         self._display_result()
 
+    def _record_position(self):
+        key = self.board.position.hash
+        self.position_counts[key] = self.position_counts.get(key, 0) + 1
+
+    def is_threefold_repetition(self):
+        return self.position_counts.get(self.board.position.hash, 0) >= 3
+
+    def is_fifty_move_draw(self):
+        return self.board.position.halfmove_clock >= 100
+
     def _is_game_over(self):
-        return self.board.is_checkmate(Color.WHITE) or self.board.is_checkmate(Color.BLACK) or \
-               self.board.is_stalemate(Color.WHITE) or self.board.is_stalemate(Color.BLACK)
+        # Only the side to move can be checkmated or stalemated
+        return self.is_threefold_repetition() or self.is_fifty_move_draw() or \
+            not self.board.has_legal_move(self.players[self.current_player].color)
 
     def _get_player_move(self, player):
+        move = player.choose_move(self.board)
+        if move is not None:
+            return move
+
         while True:  # Loop until a valid move is made
             try:
                 source_row = int(input("Enter source row: "))
@@ -250,20 +1107,654 @@ class Game:
             except ValueError as e:
                 print(e)  # Print the error message and prompt again
 
+    def get_result(self):
+        # PGN result string for the current state of the game
+        if not self.board.position.has_legal_move() and self.board.position.in_check():
+            return "0-1" if self.board.position.side_to_move == WHITE_INDEX else "1-0"
+        if self._is_game_over():
+            return "1/2-1/2"
+        return "*"
+
+    def to_pgn(self, headers=None):
+        moves = [entry[0] for entry in self.board.position.history]
+        return PgnGame.from_moves(moves, self.start_fen, headers, self.get_result()).to_pgn()
+
     def _display_result(self):
-        if self.board.is_checkmate(Color.WHITE):
-            print("Black wins by checkmate!")
-        elif self.board.is_checkmate(Color.BLACK):
-            print("White wins by checkmate!")
-        elif self.board.is_stalemate(Color.WHITE) or self.board.is_stalemate(Color.BLACK):
+        color = self.players[self.current_player].color
+        if self.is_threefold_repetition():
+            print("The game is drawn by threefold repetition!")
+        elif self.is_fifty_move_draw():
+            print("The game is drawn by the fifty-move rule!")
+        elif self.board.is_in_check(color):
+            winner = Color.BLACK if color == Color.WHITE else Color.WHITE
+            print(f"{winner.name.capitalize()} wins by checkmate!")
+        else:
             print("The game ends in a stalemate!")
 
 
+# pgn.py
+def parse_san(position, san):
+    # Resolves a SAN move such as "Nbd7", "exd8=Q+" or "O-O" against the legal moves of the position
+    text = san.rstrip("+#!?")
+    moves = position.generate_legal_moves()
+    if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        queen_side = len(text) == 5
+        for move in moves:
+            if move_flags(move) & FLAG_CASTLE and (move_to(move) < move_from(move)) == queen_side:
+                return move
+        raise ValueError(f"Illegal move: {san}")
+
+    promotion = 0
+    if "=" in text:
+        text, promoted = text.split("=", 1)
+        promotion = "NBRQ".index(promoted[:1].upper()) + 1 if promoted[:1].upper() in "NBRQ" else -1
+    elif len(text) > 2 and text[-1] in "NBRQ" and text[-2] in "18":
+        promotion = "NBRQ".index(text[-1]) + 1
+        text = text[:-1]
+    piece_type = PAWN
+    if text[:1] in ("N", "B", "R", "Q", "K"):
+        piece_type = "PNBRQK".index(text[0])
+        text = text[1:]
+    text = text.replace("x", "").replace("-", "")
+    if len(text) < 2 or promotion < 0:
+        raise ValueError(f"Invalid move: {san}")
+    to_square = parse_square(text[-2:])
+    disambiguation = text[:-2]
+
+    candidates = []
+    for move in moves:
+        from_square = move_from(move)
+        if move_to(move) != to_square or position.mailbox[from_square] % 6 != piece_type \
+                or move_promotion(move) != promotion:
+            continue
+        if any(char != (square_name(from_square)[0] if char.isalpha() else square_name(from_square)[1])
+               for char in disambiguation):
+            continue
+        candidates.append(move)
+    if len(candidates) != 1:
+        raise ValueError(f"{'Ambiguous' if candidates else 'Illegal'} move: {san}")
+    return candidates[0]
+
+
+def move_to_san(position, move):
+    # Formats a legal move of the side to move in SAN, including the check or mate suffix
+    from_square = move_from(move)
+    to_square = move_to(move)
+    flags = move_flags(move)
+    if flags & FLAG_CASTLE:
+        san = "O-O" if to_square > from_square else "O-O-O"
+    else:
+        piece_type = position.mailbox[from_square] % 6
+        capture = "x" if flags & FLAG_CAPTURE else ""
+        if piece_type == PAWN:
+            san = (square_name(from_square)[0] + capture if capture else "") + square_name(to_square)
+            if move_promotion(move):
+                san += "=" + "NBRQ"[move_promotion(move) - 1]
+        else:
+            rivals = [move_from(other) for other in position.generate_legal_moves()
+                      if other != move and move_to(other) == to_square
+                      and position.mailbox[move_from(other)] == position.mailbox[from_square]]
+            disambiguation = ""
+            if rivals:
+                if all(rival & 7 != from_square & 7 for rival in rivals):
+                    disambiguation = square_name(from_square)[0]
+                elif all(rival >> 3 != from_square >> 3 for rival in rivals):
+                    disambiguation = square_name(from_square)[1]
+                else:
+                    disambiguation = square_name(from_square)
+            san = "PNBRQK"[piece_type] + disambiguation + capture + square_name(to_square)
+    position.make_move(move)
+    if position.in_check():
+        san += "+" if position.has_legal_move() else "#"
+    position.unmake_move()
+    return san
+
+
+class PgnGame:
+    RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+    def __init__(self, headers=None, moves=None, result="*"):
+        self.headers = headers or {}
+        self.moves = moves or []  # SAN strings as they appear in the movetext
+        self.result = result
+
+    @classmethod
+    def from_moves(cls, moves, start_fen=None, headers=None, result="*"):
+        # Builds a game from encoded moves played from start_fen (the standard start position by default)
+        position = BitboardPosition.from_fen(start_fen) if start_fen else BitboardPosition.starting_position()
+        headers = dict(headers or {})
+        if start_fen and start_fen != BitboardPosition.starting_position().to_fen():
+            headers.setdefault("SetUp", "1")
+            headers.setdefault("FEN", start_fen)
+        sans = []
+        for move in moves:
+            sans.append(move_to_san(position, move))
+            position.make_move(move)
+        headers["Result"] = result
+        return cls(headers, sans, result)
+
+    def starting_position(self):
+        fen = self.headers.get("FEN")
+        return BitboardPosition.from_fen(fen) if fen else BitboardPosition.starting_position()
+
+    def replay(self):
+        # Yields (position, move) for each move, with the position shown before the move is played.
+        # The same position object is updated in place, so callers must copy anything they keep.
+        position = self.starting_position()
+        for san in self.moves:
+            move = parse_san(position, san)
+            yield position, move
+            position.make_move(move)
+
+    def final_position(self):
+        position = self.starting_position()
+        for san in self.moves:
+            position.make_move(parse_san(position, san))
+        return position
+
+    def to_pgn(self):
+        lines = [f'[{key} "{value}"]' for key, value in self.headers.items()]
+        position = self.starting_position()
+        number = position.fullmove_number
+        tokens = []
+        for index, san in enumerate(self.moves):
+            white_to_move = (position.side_to_move == WHITE_INDEX) == (index % 2 == 0)
+            if white_to_move:
+                tokens.append(f"{number}.")
+            elif index == 0:
+                tokens.append(f"{number}...")
+            tokens.append(san)
+            if not white_to_move:
+                number += 1
+        tokens.append(self.result)
+        movetext = []
+        line = ""
+        for token in tokens:
+            if len(line) + len(token) + 1 > 79:
+                movetext.append(line)
+                line = token
+            else:
+                line = f"{line} {token}" if line else token
+        movetext.append(line)
+        return "\n".join(lines + [""] + movetext) + "\n"
+
+
+class PgnReader:
+    # Streams games from a PGN file one at a time; only the current game is held in memory
+    def __init__(self, source):
+        self.source = source  # A path or an open text file
+
+    def __iter__(self):
+        if isinstance(self.source, str):
+            with open(self.source, encoding="utf-8", errors="replace") as pgn_file:
+                yield from self._read_games(pgn_file)
+        else:
+            yield from self._read_games(self.source)
+
+    def _read_games(self, lines):
+        headers = {}
+        moves = []
+        comment_depth = 0  # Inside a {...} comment, which may span lines
+        variation_depth = 0  # Inside nested (...) variations, which are skipped
+        for line in lines:
+            line = line.strip()
+            if comment_depth == 0 and variation_depth == 0:
+                if line.startswith("%"):
+                    continue
+                if line.startswith("["):
+                    if moves:  # A header after movetext starts a new game even without a result token
+                        yield PgnGame(headers, moves)
+                        headers, moves = {}, []
+                    key, _, value = line[1:].rstrip("]").partition(" ")
+                    headers[key] = value.strip().strip('"')
+                    continue
+            for token in self._tokenize(line):
+                if token == "{":
+                    comment_depth += 1
+                elif token == "}":
+                    comment_depth = max(comment_depth - 1, 0)
+                elif comment_depth:
+                    continue
+                elif token == "(":
+                    variation_depth += 1
+                elif token == ")":
+                    variation_depth = max(variation_depth - 1, 0)
+                elif variation_depth:
+                    continue
+                elif token in PgnGame.RESULTS:
+                    headers.setdefault("Result", token)
+                    yield PgnGame(headers, moves, token)
+                    headers, moves = {}, []
+                elif token[0] == "$" or token.rstrip(".").isdigit():
+                    continue  # NAGs and move numbers
+                else:
+                    if token[0].isdigit():
+                        token = token.split(".")[-1]  # "12.e4" written without a space
+                        if not token:
+                            continue
+                    moves.append(token)
+        if moves or headers:
+            yield PgnGame(headers, moves, headers.get("Result", "*"))
+
+    @staticmethod
+    def _tokenize(line):
+        token = ""
+        for char in line:
+            if char == ";":
+                break  # Rest-of-line comment
+            if char in "{}()":
+                if token:
+                    yield token
+                    token = ""
+                yield char
+            elif char.isspace():
+                if token:
+                    yield token
+                    token = ""
+            else:
+                token += char
+        if token:
+            yield token
+
+
+# opening_book.py
+class OpeningBookBuilder:
+    # Counts (position hash, move) pairs over the opening plies of a PGN corpus
+    def __init__(self, max_plies=20, min_count=1):
+        self.max_plies = max_plies
+        self.min_count = min_count
+        self.counts = {}  # (zobrist hash, book move) -> times played
+        self.games = 0
+
+    def add_game(self, game):
+        try:
+            for ply, (position, move) in enumerate(game.replay()):
+                if ply >= self.max_plies:
+                    break
+                key = (position.hash, move & OpeningBook.MOVE_MASK)
+                self.counts[key] = self.counts.get(key, 0) + 1
+        except ValueError:
+            pass  # Keep the plies before an illegal or unparsable move
+        self.games += 1
+
+    def add_pgn(self, source):
+        for game in PgnReader(source):
+            self.add_game(game)
+
+    def write(self, path):
+        # Records are sorted by hash, and by descending weight within a hash
+        records = sorted(((key, move, min(count, 0xFFFF)) for (key, move), count in self.counts.items()
+                          if count >= self.min_count), key=lambda record: (record[0], -record[2]))
+        with open(path, "wb") as book_file:
+            for record in records:
+                book_file.write(OpeningBook.RECORD.pack(*record))
+        return len(records)
+
+
+class OpeningBook:
+    # Read-only book over a memory-mapped file of fixed-size records, searched in place.
+    # Opening it costs nothing up front, and every process mapping the same file shares its pages.
+    RECORD = struct.Struct("<QHH")  # zobrist hash, move (from | to << 6 | promotion << 12), weight
+    KEY = struct.Struct("<Q")
+    MOVE_MASK = 0x7FFF
+
+    def __init__(self, path):
+        self.path = path
+        self._open()
+
+    def _open(self):
+        self.file = open(self.path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.count = size // self.RECORD.size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def __getstate__(self):
+        # Worker processes re-map the file rather than receiving a copy of it
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._open()
+
+    def __len__(self):
+        return self.count
+
+    def _lower_bound(self, key):
+        low, high = 0, self.count
+        record_size = self.RECORD.size
+        while low < high:
+            middle = (low + high) >> 1
+            if self.KEY.unpack_from(self.data, middle * record_size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get_entries(self, position):
+        # Returns [(move, weight)] for the position, best first, keeping only moves that are legal here
+        if not self.count:
+            return []
+        entries = []
+        index = self._lower_bound(position.hash)
+        legal_moves = None
+        while index < self.count:
+            key, book_move, weight = self.RECORD.unpack_from(self.data, index * self.RECORD.size)
+            if key != position.hash:
+                break
+            if legal_moves is None:
+                legal_moves = {move & self.MOVE_MASK: move for move in position.generate_legal_moves()}
+            if book_move in legal_moves:  # Guards against hash collisions
+                entries.append((legal_moves[book_move], weight))
+            index += 1
+        return entries
+
+    def choose_move(self, position, rng=random):
+        # Weighted random choice among the book moves, or None when out of book
+        entries = self.get_entries(position)
+        if not entries:
+            return None
+        return rng.choices([move for move, _ in entries], [weight for _, weight in entries])[0]
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# parallel_analysis.py
+class AnalysisResult:
+    def __init__(self, fen, best_move, score, depth, nodes, error=None):
+        self.fen = fen
+        self.best_move = best_move  # UCI string, or None when the side to move has no legal moves
+        self.score = score  # Centipawns from the side to move's point of view
+        self.depth = depth
+        self.nodes = nodes
+        self.error = error  # Why the position could not be analyzed, e.g. a malformed FEN
+
+
+# Each worker process keeps its own engine, and with it its own transposition table
+_worker_engine = None
+_worker_book = None
+
+
+def _init_analysis_worker(tt_size, book_path=None):
+    global _worker_engine, _worker_book
+    _worker_engine = SearchEngine(TranspositionTable(tt_size))
+    _worker_book = OpeningBook(book_path) if book_path else None  # Each worker maps the same file
+
+
+def _analyze_fen(task):
+    fen, time_limit, max_depth = task
+    try:
+        position = BitboardPosition.from_fen(fen)
+        entries = _worker_book.get_entries(position) if _worker_book else []
+        if entries:
+            return AnalysisResult(fen, move_to_uci(entries[0][0]), 0, 0, 0)
+        move, score, depth = _worker_engine.search(position, time_limit, max_depth)
+    except Exception as error:
+        # A bad line becomes an error result so the rest of the batch keeps streaming
+        return AnalysisResult(fen, None, 0, 0, 0, error=str(error))
+    return AnalysisResult(fen, move_to_uci(move) if move else None, score, depth, _worker_engine.nodes)
+
+
+def _search_root_moves(task):
+    # Finds the best move among a subset of the root moves
+    fen, moves, time_limit, max_depth = task
+    position = BitboardPosition.from_fen(fen)
+    move, score, depth = _worker_engine.search(position, time_limit, max_depth, moves)
+    return move, score, depth, _worker_engine.nodes
+
+
+class ParallelAnalyzer:
+    def __init__(self, num_workers=None, tt_size=1 << 16, max_pending=None, book_path=None):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.num_workers * 4  # Bounds memory when reading huge FEN streams
+        self.pool = multiprocessing.Pool(self.num_workers, initializer=_init_analysis_worker,
+                                         initargs=(tt_size, book_path))
+
+    def analyze_batch(self, fens, time_limit=None, max_depth=4):
+        # Lazily yields an AnalysisResult per FEN, in input order, with a bounded number of positions in flight
+        pending = deque()
+        for fen in fens:
+            fen = fen.strip()
+            if not fen:
+                continue
+            pending.append(self.pool.apply_async(_analyze_fen, ((fen, time_limit, max_depth),)))
+            if len(pending) >= self.max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+    def analyze_position(self, fen, time_limit=None, max_depth=4):
+        # Splits the root moves of a single position across the workers
+        position = BitboardPosition.from_fen(fen)
+        moves = position.generate_legal_moves()
+        if not moves:
+            score = -SearchEngine.MATE_SCORE if position.in_check() else 0
+            return AnalysisResult(fen, None, score, 0, 1)
+        groups = [moves[index::self.num_workers] for index in range(min(self.num_workers, len(moves)))]
+        tasks = [(fen, group, time_limit, max_depth) for group in groups]
+        best_move, best_score, best_depth, nodes = 0, -SearchEngine.INFINITY, 0, 0
+        for move, score, depth, worker_nodes in self.pool.imap_unordered(_search_root_moves, tasks):
+            nodes += worker_nodes
+            # Prefer deeper results when a time limit stopped workers at different depths
+            if (depth, score) > (best_depth, best_score):
+                best_move, best_score, best_depth = move, score, depth
+        return AnalysisResult(fen, move_to_uci(best_move), best_score, best_depth, nodes)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# perft.py
+# Standard test positions with published leaf counts per depth
+PERFT_POSITIONS = [
+    ("startpos", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", [46, 2079, 89890, 3894594]),
+]
+
+
+def perft(position, depth):
+    # Counts leaf nodes; the last ply is bulk-counted from the move list
+    moves = position.generate_legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        position.make_move(move)
+        nodes += perft(position, depth - 1)
+        position.unmake_move()
+    return nodes
+
+
+def divide(position, depth):
+    # Per-root-move leaf counts, for narrowing down a mismatch against a reference engine
+    counts = {}
+    for move in position.generate_legal_moves():
+        position.make_move(move)
+        counts[move_to_uci(move)] = perft(position, depth - 1)
+        position.unmake_move()
+    return counts
+
+
+class PerftSuite:
+    def __init__(self, max_depth=3, positions=None):
+        self.max_depth = max_depth
+        self.positions = positions or PERFT_POSITIONS
+
+    def run(self):
+        results = []
+        for name, fen, expected_counts in self.positions:
+            position = BitboardPosition.from_fen(fen)
+            depth = min(self.max_depth, len(expected_counts))
+            start = time.perf_counter()
+            nodes = perft(position, depth)
+            elapsed = time.perf_counter() - start
+            results.append({
+                "name": name,
+                "depth": depth,
+                "nodes": nodes,
+                "expected": expected_counts[depth - 1],
+                "passed": nodes == expected_counts[depth - 1],
+                "seconds": elapsed,
+                "nodes_per_second": nodes / elapsed if elapsed else 0.0,
+            })
+        return results
+
+    def report(self):
+        results = self.run()
+        for result in results:
+            status = "ok" if result["passed"] else f"FAILED (expected {result['expected']})"
+            print(f"{result['name']:<10} depth {result['depth']}: {result['nodes']:>9} nodes "
+                  f"in {result['seconds']:.2f}s ({result['nodes_per_second']:,.0f} nodes/s) {status}")
+        return all(result["passed"] for result in results)
+
+
+class PerftBenchmark:
+    # Regression mode: compares nodes/sec against a saved baseline so move generation changes are measurable
+    def __init__(self, baseline_path="perft_baseline.json", max_depth=3, repeats=3, min_seconds=0.5, tolerance=0.10):
+        self.baseline_path = baseline_path
+        self.max_depth = max_depth
+        self.repeats = repeats
+        self.min_seconds = min_seconds  # Small trees are re-run until each sample covers this much time
+        self.tolerance = tolerance
+
+    def measure(self):
+        # Best of several samples per position to damp scheduling noise
+        best = {}
+        for name, fen, expected_counts in PERFT_POSITIONS:
+            position = BitboardPosition.from_fen(fen)
+            depth = min(self.max_depth, len(expected_counts))
+            for _ in range(self.repeats):
+                nodes = 0
+                start = time.perf_counter()
+                while True:
+                    count = perft(position, depth)
+                    if count != expected_counts[depth - 1]:
+                        raise ValueError(f"Perft mismatch for {name}: {count} != {expected_counts[depth - 1]}")
+                    nodes += count
+                    elapsed = time.perf_counter() - start
+                    if elapsed >= self.min_seconds:
+                        break
+                best[name] = max(best.get(name, 0.0), nodes / elapsed)
+        return best
+
+    def save_baseline(self, measurements):
+        with open(self.baseline_path, "w") as baseline_file:
+            json.dump({"max_depth": self.max_depth, "nodes_per_second": measurements}, baseline_file, indent=2)
+
+    def run(self):
+        measurements = self.measure()
+        if not os.path.exists(self.baseline_path):
+            self.save_baseline(measurements)
+            print(f"No baseline found; saved current results to {self.baseline_path}")
+            return True
+        with open(self.baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)["nodes_per_second"]
+        passed = True
+        for name, nodes_per_second in measurements.items():
+            if name not in baseline:
+                continue
+            change = nodes_per_second / baseline[name] - 1
+            if change < -self.tolerance:
+                passed = False
+                verdict = "REGRESSION"
+            else:
+                verdict = "ok"
+            print(f"{name:<10} {nodes_per_second:>10,.0f} nodes/s vs {baseline[name]:>10,.0f} ({change:+.1%}) {verdict}")
+        return passed
+
+
 class ChessGameDemo:
     @staticmethod
     def run():
         game = Game()
         game.start()
 
+    @staticmethod
+    def run_engine_match(time_limit=0.5, book_path=None):
+        # Headless engine-vs-engine game
+        book = OpeningBook(book_path) if book_path else None
+        game = Game([EnginePlayer(Color.WHITE, time_limit, opening_book=book),
+                     EnginePlayer(Color.BLACK, time_limit, opening_book=book)], verbose=False)
+        game.start()
+        print(game.to_pgn())
+
+    @staticmethod
+    def build_opening_book(pgn_path, book_path, max_plies=20):
+        start = time.perf_counter()
+        builder = OpeningBookBuilder(max_plies)
+        builder.add_pgn(pgn_path)
+        records = builder.write(book_path)
+        print(f"Wrote {records} book entries from {builder.games} games in {time.perf_counter() - start:.2f}s")
+
+    @staticmethod
+    def run_batch_analysis(path, max_depth=3):
+        # Streams FEN lines from a file through the worker pool
+        with open(path) as fens, ParallelAnalyzer() as analyzer:
+            start = time.perf_counter()
+            count = 0
+            for result in analyzer.analyze_batch(fens, max_depth=max_depth):
+                count += 1
+                if result.error:
+                    print(f"{result.fen} | error: {result.error}")
+                    continue
+                print(f"{result.fen} | {result.best_move} {result.score:+d} (depth {result.depth}, {result.nodes} nodes)")
+            elapsed = time.perf_counter() - start
+            print(f"Analyzed {count} positions with {analyzer.num_workers} workers "
+                  f"in {elapsed:.2f}s ({count / elapsed:.1f} positions/s)")
+
+    @staticmethod
+    def run_pgn_import(path):
+        # Streams every game in a PGN file and replays it on a bitboard position
+        start = time.perf_counter()
+        games = plies = errors = 0
+        for game in PgnReader(path):
+            try:
+                final_position = game.final_position()
+            except ValueError as e:
+                errors += 1
+                print(f"Skipping game {games + 1}: {e}")
+                continue
+            games += 1
+            plies += len(game.moves)
+            print(f"{game.headers.get('White', '?')} - {game.headers.get('Black', '?')} {game.result}: "
+                  f"{len(game.moves)} plies, final FEN {final_position.to_fen()}")
+        elapsed = time.perf_counter() - start
+        print(f"Imported {games} games ({plies} plies, {errors} skipped) in {elapsed:.2f}s")
+
 if __name__ == "__main__":
-    ChessGameDemo.run()
\ No newline at end of file
+    import sys
+    if "--build-book" in sys.argv:
+        index = sys.argv.index("--build-book")
+        ChessGameDemo.build_opening_book(sys.argv[index + 1], sys.argv[index + 2])
+    elif "--engine" in sys.argv:
+        book_path = sys.argv[sys.argv.index("--book") + 1] if "--book" in sys.argv else None
+        ChessGameDemo.run_engine_match(book_path=book_path)
+    elif "--analyze" in sys.argv:
+        ChessGameDemo.run_batch_analysis(sys.argv[sys.argv.index("--analyze") + 1])
+    elif "--pgn" in sys.argv:
+        ChessGameDemo.run_pgn_import(sys.argv[sys.argv.index("--pgn") + 1])
+    elif "--perft" in sys.argv:
+        sys.exit(0 if PerftSuite().report() else 1)
+    elif "--perft-benchmark" in sys.argv:
+        sys.exit(0 if PerftBenchmark().run() else 1)
+    else:
+        ChessGameDemo.run()
\ No newline at end of file
@@ -80,15 +80,23 @@
 
 
 from enum import Enum
-from abc import ABC
-from typing import List
-from threading import Lock
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from threading import Lock, Thread
+from multiprocessing import Pipe, Process
+from datetime import datetime
+import heapq
+import random
+import time
 
 class VehicleType(Enum):
     CAR = 1
     MOTORCYCLE = 2
     TRUCK = 3
 
+    # Members are singletons, so identity hashing is safe and avoids Enum's Python-level __hash__ on hot dict lookups
+    __hash__ = object.__hash__
+
 class Vehicle(ABC):
     def __init__(self, license_plate: str, vehicle_type: VehicleType):
         self.license_plate = license_plate
@@ -111,25 +119,25 @@ class Truck(Vehicle):
 
 
 class ParkingSpot:
+    # Spots are guarded by their level's per-type lock; slots keep large garages small in memory
+    __slots__ = ("spot_number", "vehicle_type", "parked_vehicle")
+
     def __init__(self, spot_number: int, vehicle_type: VehicleType):
         self.spot_number = spot_number
         self.vehicle_type = vehicle_type# Default vehicle type is CAR
         self.parked_vehicle = None
-        self.spot_lock = Lock()  # Add lock for spot operations
 
     def is_available(self) -> bool:
         return self.parked_vehicle is None
 
     def park_vehicle(self, vehicle: Vehicle) -> None:
-        with self.spot_lock:  # Thread-safe spot parking
-            if self.is_available() and vehicle.get_type() == self.vehicle_type:
-                self.parked_vehicle = vehicle
-            else:
-                raise ValueError("Invalid vehicle type or spot already occupied.")
+        if self.is_available() and vehicle.get_type() == self.vehicle_type:
+            self.parked_vehicle = vehicle
+        else:
+            raise ValueError("Invalid vehicle type or spot already occupied.")
 
     def unpark_vehicle(self) -> None:
-        with self.spot_lock:  # Thread-safe spot unparking
-            self.parked_vehicle = None
+        self.parked_vehicle = None
 
     def get_vehicle_type(self) -> VehicleType:
         return self.vehicle_type
@@ -144,21 +152,98 @@ class Level:
     def __init__(self, floor: int, num_spots: int):
         self.floor = floor
         self.parking_spots: List[ParkingSpot] = [ParkingSpot(i, VehicleType.CAR) if i%3==0 else ParkingSpot(i, VehicleType.MOTORCYCLE) if i%3==1 else ParkingSpot(i, VehicleType.TRUCK) for i in range(num_spots)]
-        self.level_lock = Lock()  # Add lock for level operations
-
-    def park_vehicle(self, vehicle: Vehicle) -> bool:
-        with self.level_lock:  # Thread-safe level parking
-            for spot in self.parking_spots:
-                if spot.is_available() and spot.get_vehicle_type() == vehicle.get_type():
+        # One lock per vehicle type, so cars, motorcycles and trucks on the same level are allocated in parallel
+        self.type_locks: Dict[VehicleType, Lock] = {vehicle_type: Lock() for vehicle_type in VehicleType}
+        # Min-heap of free spot numbers per vehicle type, so the lowest free spot is found in O(log n)
+        self.free_spots: Dict[VehicleType, List[int]] = {vehicle_type: [] for vehicle_type in VehicleType}
+        for spot in self.parking_spots:
+            self.free_spots[spot.get_vehicle_type()].append(spot.get_spot_number())
+        for spot_numbers in self.free_spots.values():
+            heapq.heapify(spot_numbers)
+        # Occupancy bitset per vehicle type indexed by spot number, counted with popcount for availability boards
+        self.type_totals: Dict[VehicleType, int] = {vehicle_type: len(self.free_spots[vehicle_type]) for vehicle_type in VehicleType}
+        self.occupancy: Dict[VehicleType, bytearray] = {vehicle_type: bytearray((num_spots + 7) // 8) for vehicle_type in VehicleType}
+        # Heaps are pruned lazily once spots can be claimed directly, so free counts are tracked separately
+        self.free_counts: Dict[VehicleType, int] = dict(self.type_totals)
+
+    def get_free_count(self, vehicle_type: VehicleType) -> int:
+        return self.free_counts[vehicle_type]
+
+    def get_total_free_count(self) -> int:
+        return sum(self.free_counts.values())
+
+    def _mark_occupied(self, spot_number: int, vehicle_type: VehicleType) -> None:
+        self.occupancy[vehicle_type][spot_number >> 3] |= 1 << (spot_number & 7)
+        self.free_counts[vehicle_type] -= 1
+
+    def _mark_free(self, spot_number: int, vehicle_type: VehicleType) -> None:
+        self.occupancy[vehicle_type][spot_number >> 3] &= ~(1 << (spot_number & 7)) & 0xFF
+        self.free_counts[vehicle_type] += 1
+        free_spots = self.free_spots[vehicle_type]
+        heapq.heappush(free_spots, spot_number)
+        if len(free_spots) > 2 * self.type_totals[vehicle_type] + 16:
+            self._compact_free_spots(vehicle_type)
+
+    def _compact_free_spots(self, vehicle_type: VehicleType) -> None:
+        # Spots claimed through park_at leave their entries behind; drop those and duplicates so the heap stays
+        # proportional to the number of spots. A sorted list is already a valid heap.
+        self.free_spots[vehicle_type][:] = sorted({spot_number for spot_number in self.free_spots[vehicle_type]
+                                                   if self.parking_spots[spot_number].is_available()})
+
+    def is_spot_occupied(self, spot_number: int) -> bool:
+        vehicle_type = self.parking_spots[spot_number].get_vehicle_type()
+        return bool(self.occupancy[vehicle_type][spot_number >> 3] >> (spot_number & 7) & 1)
+
+    def get_occupied_count(self, vehicle_type: VehicleType) -> int:
+        return int.from_bytes(self.occupancy[vehicle_type], "little").bit_count()
+
+    def availability_summary(self) -> Dict[VehicleType, Dict[str, int]]:
+        summary = {}
+        for vehicle_type in VehicleType:
+            occupied = self.get_occupied_count(vehicle_type)
+            total = self.type_totals[vehicle_type]
+            summary[vehicle_type] = {"total": total, "occupied": occupied, "free": total - occupied}
+        return summary
+
+    def park_vehicle(self, vehicle: Vehicle) -> Optional[ParkingSpot]:
+        with self.type_locks[vehicle.get_type()]:  # Thread-safe level parking
+            free_spots = self.free_spots[vehicle.get_type()]
+            while free_spots:
+                spot = self.parking_spots[heapq.heappop(free_spots)]
+                if spot.is_available():  # Skip entries for spots claimed directly via park_at
                     spot.park_vehicle(vehicle)
-                    return True
-            return False
+                    self._mark_occupied(spot.get_spot_number(), spot.get_vehicle_type())
+                    return spot
+            return None
+
+    def park_at(self, vehicle: Vehicle, spot_number: int) -> Optional[ParkingSpot]:
+        # Claims a specific spot if it is still free and fits the vehicle; the caller retries elsewhere otherwise
+        spot = self.parking_spots[spot_number]
+        if spot.get_vehicle_type() != vehicle.get_type():
+            return None
+        with self.type_locks[vehicle.get_type()]:
+            if not spot.is_available():
+                return None
+            spot.park_vehicle(vehicle)
+            self._mark_occupied(spot_number, spot.get_vehicle_type())
+            return spot
+
+    def unpark_spot(self, spot_number: int) -> Optional[Vehicle]:
+        spot = self.parking_spots[spot_number]
+        with self.type_locks[spot.get_vehicle_type()]:  # Thread-safe level unparking
+            vehicle = spot.get_parked_vehicle()
+            if vehicle is None:
+                return None
+            spot.unpark_vehicle()
+            self._mark_free(spot_number, spot.get_vehicle_type())
+            return vehicle
 
     def unpark_vehicle(self, vehicle: Vehicle) -> bool:
-        with self.level_lock:  # Thread-safe level unparking
+        with self.type_locks[vehicle.get_type()]:  # Thread-safe level unparking
             for spot in self.parking_spots:
                 if not spot.is_available() and spot.get_parked_vehicle() == vehicle:
                     spot.unpark_vehicle()
+                    self._mark_free(spot.get_spot_number(), spot.get_vehicle_type())
                     return True
             return False
 
@@ -168,17 +253,275 @@ class Level:
             print(f"Spot {spot.get_spot_number()}: {'Available' if spot.is_available() else 'Occupied'}")
 
 
+class Ticket:
+    def __init__(self, ticket_id: str, vehicle: Vehicle, level: Level, spot: ParkingSpot):
+        self.ticket_id = ticket_id
+        self.vehicle = vehicle
+        self.level = level
+        self.spot = spot
+        self.issue_time = datetime.now()
+
+    def get_ticket_id(self) -> str:
+        return self.ticket_id
+
+    def get_vehicle(self) -> Vehicle:
+        return self.vehicle
+
+    def get_level(self) -> Level:
+        return self.level
+
+    def get_spot(self) -> ParkingSpot:
+        return self.spot
+
+
+class AccessPoint:
+    # Entry gate or elevator location used to rank spots by distance
+    def __init__(self, point_id: str, floor: int, position: int):
+        self.point_id = point_id
+        self.floor = floor
+        self.position = position
+
+    def distance_to(self, floor: int, spot_number: int, floor_penalty: int) -> int:
+        return abs(floor - self.floor) * floor_penalty + abs(spot_number - self.position)
+
+
+class AllocationStrategy(ABC):
+    @abstractmethod
+    def allocate(self, levels: List[Level], vehicle: Vehicle, gate: Optional[AccessPoint] = None) -> Optional[Tuple[Level, ParkingSpot]]:
+        pass
+
+    def on_level_added(self, level: Level) -> None:
+        pass
+
+    def on_spot_freed(self, level: Level, spot_number: int) -> None:
+        pass
+
+
+class FirstAvailableStrategy(AllocationStrategy):
+    # Min-heap per vehicle type of the levels that may still have a free spot, so full levels cost nothing
+    def __init__(self):
+        self.levels: List[Level] = []
+        self.level_indexes: Dict[int, int] = {}
+        self.open_levels: Dict[VehicleType, List[int]] = {vehicle_type: [] for vehicle_type in VehicleType}
+        self.queued: Dict[VehicleType, set] = {vehicle_type: set() for vehicle_type in VehicleType}
+        self.locks: Dict[VehicleType, Lock] = {vehicle_type: Lock() for vehicle_type in VehicleType}
+
+    def _open_level(self, level_index: int, vehicle_type: VehicleType) -> None:
+        with self.locks[vehicle_type]:
+            if level_index not in self.queued[vehicle_type]:
+                self.queued[vehicle_type].add(level_index)
+                heapq.heappush(self.open_levels[vehicle_type], level_index)
+
+    def on_level_added(self, level: Level) -> None:
+        level_index = len(self.levels)
+        self.levels.append(level)
+        self.level_indexes[id(level)] = level_index
+        for vehicle_type in VehicleType:
+            if level.get_free_count(vehicle_type):
+                self._open_level(level_index, vehicle_type)
+
+    def on_spot_freed(self, level: Level, spot_number: int) -> None:
+        level_index = self.level_indexes.get(id(level))
+        if level_index is not None:
+            self._open_level(level_index, level.parking_spots[spot_number].get_vehicle_type())
+
+    def allocate(self, levels: List[Level], vehicle: Vehicle, gate: Optional[AccessPoint] = None) -> Optional[Tuple[Level, ParkingSpot]]:
+        # The strategy lock only guards the level heap; the spot itself is claimed under the level's own type lock
+        vehicle_type = vehicle.get_type()
+        open_levels = self.open_levels[vehicle_type]
+        lock = self.locks[vehicle_type]
+        while True:
+            with lock:
+                if not open_levels:
+                    return None
+                level_index = open_levels[0]
+            level = self.levels[level_index]
+            spot = level.park_vehicle(vehicle)
+            if spot:
+                return level, spot
+            with lock:
+                # Drop the level only if it is still full. A release bumps the free count before calling
+                # on_spot_freed, so a spot freed meanwhile either shows here or re-queues the level afterwards.
+                if open_levels and open_levels[0] == level_index and not level.get_free_count(vehicle_type):
+                    heapq.heappop(open_levels)
+                    self.queued[vehicle_type].discard(level_index)
+
+
+class DistanceAllocationStrategy(AllocationStrategy):
+    # Keeps one min-heap of (distance, floor, spot) per queue and vehicle type. Entries are deleted lazily:
+    # a popped entry is used only if its spot is still free and its version matches the spot's latest release.
+    def __init__(self, floor_penalty: int = 100):
+        self.floor_penalty = floor_penalty
+        self.levels: List[Level] = []
+        self.level_indexes: Dict[int, int] = {}  # id(level) -> index into self.levels
+        self.versions: List[List[int]] = []  # Per level, bumped every time a spot is released
+        self.queues: Dict[Tuple[str, VehicleType], list] = {}
+        self.queue_locks: Dict[Tuple[str, VehicleType], Lock] = {}
+        self.spot_counts: Dict[VehicleType, int] = {vehicle_type: 0 for vehicle_type in VehicleType}
+        self.registry_lock = Lock()
+
+    @abstractmethod
+    def _distances(self, floor: int, spot_number: int) -> List[Tuple[str, int]]:
+        # (queue key, distance) pairs for a spot
+        pass
+
+    @abstractmethod
+    def _queue_key(self, gate: Optional[AccessPoint]) -> str:
+        pass
+
+    def _queue(self, key: str, vehicle_type: VehicleType) -> list:
+        queue_id = (key, vehicle_type)
+        if queue_id not in self.queues:
+            self.queues[queue_id] = []
+            self.queue_locks[queue_id] = Lock()
+        return self.queues[queue_id]
+
+    def _push_spot(self, level_index: int, spot: ParkingSpot, version: int) -> None:
+        level = self.levels[level_index]
+        for key, distance in self._distances(level.floor, spot.get_spot_number()):
+            queue_id = (key, spot.get_vehicle_type())
+            with self.queue_locks[queue_id]:
+                queue = self.queues[queue_id]
+                heapq.heappush(queue, (distance, level.floor, spot.get_spot_number(), level_index, version))
+                if len(queue) > 2 * self.spot_counts[spot.get_vehicle_type()] + 16:
+                    self._compact(queue)
+
+    def _compact(self, queue: list) -> None:
+        # Drop superseded and occupied entries so heaps stay proportional to the number of spots
+        queue[:] = [entry for entry in queue
+                    if entry[4] == self.versions[entry[3]][entry[2]] and self.levels[entry[3]].parking_spots[entry[2]].is_available()]
+        heapq.heapify(queue)
+
+    def on_level_added(self, level: Level) -> None:
+        with self.registry_lock:
+            level_index = len(self.levels)
+            self.levels.append(level)
+            self.level_indexes[id(level)] = level_index
+            self.versions.append([0] * len(level.parking_spots))
+            for vehicle_type in VehicleType:
+                self.spot_counts[vehicle_type] += level.type_totals[vehicle_type]
+            for spot in level.parking_spots:
+                for key, _ in self._distances(level.floor, spot.get_spot_number()):
+                    self._queue(key, spot.get_vehicle_type())
+            for spot in level.parking_spots:
+                if spot.is_available():
+                    self._push_spot(level_index, spot, 0)
+
+    def on_spot_freed(self, level: Level, spot_number: int) -> None:
+        level_index = self.level_indexes.get(id(level))
+        if level_index is None:
+            return
+        versions = self.versions[level_index]
+        versions[spot_number] += 1
+        self._push_spot(level_index, level.parking_spots[spot_number], versions[spot_number])
+
+    def allocate(self, levels: List[Level], vehicle: Vehicle, gate: Optional[AccessPoint] = None) -> Optional[Tuple[Level, ParkingSpot]]:
+        queue_id = (self._queue_key(gate), vehicle.get_type())
+        queue = self.queues.get(queue_id)
+        if queue is None:
+            return None
+        with self.queue_locks[queue_id]:
+            while queue:
+                _, _, spot_number, level_index, version = heapq.heappop(queue)
+                if version != self.versions[level_index][spot_number]:
+                    continue  # Superseded by a newer entry pushed on release
+                level = self.levels[level_index]
+                spot = level.park_at(vehicle, spot_number)
+                if spot:
+                    return level, spot
+        return None
+
+
+class NearestToGateStrategy(DistanceAllocationStrategy):
+    def __init__(self, gates: List[AccessPoint], floor_penalty: int = 100):
+        super().__init__(floor_penalty)
+        self.gates = gates
+
+    def _distances(self, floor: int, spot_number: int) -> List[Tuple[str, int]]:
+        return [(gate.point_id, gate.distance_to(floor, spot_number, self.floor_penalty)) for gate in self.gates]
+
+    def _queue_key(self, gate: Optional[AccessPoint]) -> str:
+        if gate is None:
+            return self.gates[0].point_id
+        if all(known.point_id != gate.point_id for known in self.gates):
+            # Without this an unregistered gate finds no queue and the lot looks full
+            raise ValueError(f"Unknown gate {gate.point_id}")
+        return gate.point_id
+
+
+class NearestToElevatorStrategy(DistanceAllocationStrategy):
+    def __init__(self, elevators: List[AccessPoint], floor_penalty: int = 0):
+        # Elevators serve every floor, so by default only the walk along the level counts
+        super().__init__(floor_penalty)
+        self.elevators = elevators
+
+    def _distances(self, floor: int, spot_number: int) -> List[Tuple[str, int]]:
+        return [("elevator", min(elevator.distance_to(floor, spot_number, self.floor_penalty) for elevator in self.elevators))]
+
+    def _queue_key(self, gate: Optional[AccessPoint]) -> str:
+        return "elevator"
+
+
+class BalancedLevelStrategy(AllocationStrategy):
+    # Max-heap of (free count, level) per vehicle type; stale counts are discarded lazily on pop
+    def __init__(self):
+        self.levels: List[Level] = []
+        self.level_indexes: Dict[int, int] = {}
+        self.queues: Dict[VehicleType, list] = {vehicle_type: [] for vehicle_type in VehicleType}
+        self.queue_locks: Dict[VehicleType, Lock] = {vehicle_type: Lock() for vehicle_type in VehicleType}
+
+    def _push_level(self, level_index: int, vehicle_type: VehicleType) -> None:
+        queue = self.queues[vehicle_type]
+        heapq.heappush(queue, (-self.levels[level_index].get_free_count(vehicle_type), level_index))
+        if len(queue) > 4 * len(self.levels) + 16:
+            # Rebuild from live counts so stale entries cannot pile up
+            queue[:] = [(-level.get_free_count(vehicle_type), index) for index, level in enumerate(self.levels)]
+            heapq.heapify(queue)
+
+    def on_level_added(self, level: Level) -> None:
+        level_index = len(self.levels)
+        self.levels.append(level)
+        self.level_indexes[id(level)] = level_index
+        for vehicle_type in VehicleType:
+            with self.queue_locks[vehicle_type]:
+                self._push_level(level_index, vehicle_type)
+
+    def on_spot_freed(self, level: Level, spot_number: int) -> None:
+        level_index = self.level_indexes.get(id(level))
+        if level_index is not None:
+            vehicle_type = level.parking_spots[spot_number].get_vehicle_type()
+            with self.queue_locks[vehicle_type]:
+                self._push_level(level_index, vehicle_type)
+
+    def allocate(self, levels: List[Level], vehicle: Vehicle, gate: Optional[AccessPoint] = None) -> Optional[Tuple[Level, ParkingSpot]]:
+        vehicle_type = vehicle.get_type()
+        queue = self.queues[vehicle_type]
+        with self.queue_locks[vehicle_type]:
+            while queue:
+                negative_free, level_index = heapq.heappop(queue)
+                level = self.levels[level_index]
+                if -negative_free != level.get_free_count(vehicle_type) or negative_free == 0:
+                    continue
+                spot = level.park_vehicle(vehicle)
+                self._push_level(level_index, vehicle_type)
+                if spot:
+                    return level, spot
+        return None
+
+
 class ParkingLot:
     _instance = None
     _lock = Lock()  # Class level lock
 
-    def __init__(self):
-        if ParkingLot._instance is not None:
-            raise Exception("This class is a singleton!")
-        else:
-            ParkingLot._instance = self
-            self.levels: List[Level] = []
-            self.operation_lock = Lock()  # Instance level lock for parking operations
+    def __init__(self, lot_id: str = "PL1"):
+        # Lots can be created freely (e.g. one per shard); get_instance still hands out a shared default lot
+        self.lot_id = lot_id
+        self.levels: List[Level] = []
+        self.tickets: Dict[str, Ticket] = {}  # License plate -> ticket for every parked vehicle
+        self.allocation_strategy: AllocationStrategy = FirstAvailableStrategy()
+        self.reserved_plates = set()  # Plates with a park in flight, so the same vehicle cannot take two spots
+        self.operation_lock = Lock()  # Instance level lock for level registration
+        self.index_lock = Lock()  # Short critical sections on the ticket index only; spots are locked per level and type
 
     @staticmethod
     def get_instance():
@@ -188,31 +531,402 @@ class ParkingLot:
             with ParkingLot._lock:
                 # Second check (with lock)
                 if ParkingLot._instance is None:
-                    ParkingLot()
+                    ParkingLot._instance = ParkingLot()
         return ParkingLot._instance
 
+    def get_free_counts(self) -> Dict[VehicleType, int]:
+        return {vehicle_type: sum(level.get_free_count(vehicle_type) for level in self.levels) for vehicle_type in VehicleType}
+
     def add_level(self, level: Level) -> None:
-        self.levels.append(level)
+        with self.operation_lock:
+            self.levels = self.levels + [level]  # Copy-on-write so gates can iterate levels without a lock
+            self.allocation_strategy.on_level_added(level)
 
-    def park_vehicle(self, vehicle: Vehicle) -> bool:
-        with self.operation_lock:  # Thread-safe parking operation
+    def set_allocation_strategy(self, strategy: AllocationStrategy) -> None:
+        with self.operation_lock:
             for level in self.levels:
-                if level.park_vehicle(vehicle):
-                    return True
-            return False
+                strategy.on_level_added(level)
+            self.allocation_strategy = strategy
+
+    def park_vehicle(self, vehicle: Vehicle, gate: Optional[AccessPoint] = None) -> Optional[Ticket]:
+        license_plate = vehicle.license_plate
+        with self.index_lock:
+            if license_plate in self.tickets or license_plate in self.reserved_plates:
+                return None  # Vehicle is already parked
+            self.reserved_plates.add(license_plate)
+
+        ticket = None
+        try:
+            placement = self.allocation_strategy.allocate(self.levels, vehicle, gate)
+            if placement:
+                level, spot = placement
+                ticket = Ticket(f"{self.lot_id}_{level.floor}_{spot.get_spot_number()}", vehicle, level, spot)
+        finally:
+            with self.index_lock:
+                self.reserved_plates.discard(license_plate)
+                if ticket:
+                    self.tickets[license_plate] = ticket
+        return ticket
 
     def unpark_vehicle(self, vehicle: Vehicle) -> bool:
-        with self.operation_lock:  # Thread-safe unparking operation
-            for level in self.levels:
-                if level.unpark_vehicle(vehicle):
-                    return True
+        with self.index_lock:
+            ticket = self.tickets.get(vehicle.license_plate)
+            if ticket is None or ticket.get_vehicle() is not vehicle:
+                return False
+            del self.tickets[vehicle.license_plate]
+        return self._release(ticket)
+
+    def unpark_by_ticket(self, ticket: Ticket) -> bool:
+        license_plate = ticket.get_vehicle().license_plate
+        with self.index_lock:
+            if self.tickets.get(license_plate) is not ticket:
+                return False  # Ticket already used or never issued by this lot
+            del self.tickets[license_plate]
+        return self._release(ticket)
+
+    def _release(self, ticket: Ticket) -> bool:
+        # Exit goes straight to the ticketed spot instead of searching the levels
+        level = ticket.get_level()
+        spot_number = ticket.get_spot().get_spot_number()
+        if level.unpark_spot(spot_number) is None:
             return False
+        self.allocation_strategy.on_spot_freed(level, spot_number)
+        return True
+
+    def get_ticket(self, license_plate: str) -> Optional[Ticket]:
+        return self.tickets.get(license_plate)
 
     def display_availability(self) -> None:
         for level in self.levels:
             level.display_availability()
+
+    def availability_summary(self) -> Dict[int, Dict[VehicleType, Dict[str, int]]]:
+        return {level.floor: level.availability_summary() for level in self.levels}
     
 
+class GlobalLockParkingLot(ParkingLot):
+    # Baseline for GateSimulation: every park and exit serialized on one lot-wide lock, as before per-level locking
+    def __init__(self, lot_id: str = "PL1"):
+        super().__init__(lot_id)
+        self.global_lock = Lock()
+
+    def park_vehicle(self, vehicle: Vehicle, gate: Optional[AccessPoint] = None) -> Optional[Ticket]:
+        with self.global_lock:
+            return super().park_vehicle(vehicle, gate)
+
+    def unpark_by_ticket(self, ticket: Ticket) -> bool:
+        with self.global_lock:
+            return super().unpark_by_ticket(ticket)
+
+
+class GateSimulation:
+    def __init__(self, num_levels: int = 8, spots_per_level: int = 300, gate_time: float = 0.0005):
+        self.num_levels = num_levels
+        self.spots_per_level = spots_per_level
+        self.gate_time = gate_time  # Seconds a gate spends on the barrier and ticket printer per vehicle
+
+    def _build_lot(self, global_lock: bool) -> ParkingLot:
+        parking_lot = GlobalLockParkingLot() if global_lock else ParkingLot()  # Each run models a fresh garage
+        for floor in range(1, self.num_levels + 1):
+            parking_lot.add_level(Level(floor, self.spots_per_level))
+        return parking_lot
+
+    def _run_gate(self, parking_lot: ParkingLot, gate_id: int, vehicles_per_gate: int) -> Tuple[int, float]:
+        # Returns (vehicles completed, seconds spent inside park_vehicle and unpark_by_ticket)
+        vehicle_classes = [Car, Motorcycle, Truck]
+        completed = 0
+        lot_time = 0.0
+        for i in range(vehicles_per_gate):
+            vehicle = vehicle_classes[(gate_id + i) % 3](f"G{gate_id}-{i}")
+            time.sleep(self.gate_time)  # Entry barrier
+            started = time.perf_counter()
+            ticket = parking_lot.park_vehicle(vehicle)
+            lot_time += time.perf_counter() - started
+            if ticket:
+                time.sleep(self.gate_time)  # Exit barrier
+                started = time.perf_counter()
+                parking_lot.unpark_by_ticket(ticket)
+                lot_time += time.perf_counter() - started
+                completed += 1
+        return completed, lot_time
+
+    def run(self, num_gates: int, vehicles_per_gate: int = 200, global_lock: bool = False) -> Dict[str, float]:
+        parking_lot = self._build_lot(global_lock)
+        threads = []
+        results = [(0, 0.0)] * num_gates
+
+        def gate(gate_id):
+            results[gate_id] = self._run_gate(parking_lot, gate_id, vehicles_per_gate)
+
+        started = time.perf_counter()
+        for gate_id in range(num_gates):
+            thread = Thread(target=gate, args=(gate_id,))
+            threads.append(thread)
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        completed = sum(count for count, _ in results)
+        lot_time = sum(seconds for _, seconds in results)
+        # Mean time per lot call (one park plus one exit per vehicle), including any wait for locks
+        return {"per_sec": completed / elapsed, "call_micros": lot_time / max(2 * completed, 1) * 1_000_000}
+
+    def report(self, gate_counts=(1, 2, 4, 8, 16)) -> None:
+        # Barrier sleeps run outside every lock, so compare the time spent inside the lot calls against the
+        # single global lock baseline: that is the part the per-level locking changes.
+        print("gates | per-level locks: vehicles/sec, us/call | global lock: vehicles/sec, us/call")
+        for num_gates in gate_counts:
+            striped = self.run(num_gates)
+            baseline = self.run(num_gates, global_lock=True)
+            print(f"{num_gates:>5} | {striped['per_sec']:>8.0f} {striped['call_micros']:>8.1f} "
+                  f"| {baseline['per_sec']:>8.0f} {baseline['call_micros']:>8.1f}")
+        print("Note: under CPython's GIL only one thread runs Python code at a time, so finer locks mostly "
+              "shorten lock waits rather than adding parallel CPU work.")
+
+
+class ParkingEvent(NamedTuple):
+    timestamp: float
+    kind: str  # "arrive" or "depart"
+    license_plate: str
+    vehicle_type: VehicleType
+
+
+class LatencyHistogram:
+    # Power-of-two microsecond buckets; constant memory no matter how many events are replayed
+    def __init__(self, num_buckets: int = 32):
+        self.buckets = [0] * num_buckets
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        micros = int(seconds * 1_000_000)
+        self.buckets[min(micros.bit_length(), len(self.buckets) - 1)] += 1
+        self.count += 1
+
+    def percentile(self, percent: float) -> float:
+        # Upper bound of the bucket holding the requested rank, in seconds
+        rank = self.count * percent / 100.0
+        cumulative = 0
+        for index, bucket_count in enumerate(self.buckets):
+            cumulative += bucket_count
+            if bucket_count and cumulative >= rank:
+                return (1 << index) / 1_000_000
+        return 0.0
+
+
+class EventReplaySimulator:
+    VEHICLE_CLASSES = {VehicleType.CAR: Car, VehicleType.MOTORCYCLE: Motorcycle, VehicleType.TRUCK: Truck}
+
+    def __init__(self, parking_lot: ParkingLot):
+        self.parking_lot = parking_lot
+
+    @staticmethod
+    def synthetic_events(num_events: int, arrivals_per_hour: float = 3600.0, mean_stay_hours: float = 2.0,
+                         seed: int = 42) -> Iterator[ParkingEvent]:
+        # Poisson arrivals with exponential stays; only vehicles currently inside are held in memory
+        rng = random.Random(seed)
+        vehicle_types = list(VehicleType)
+        departures = []
+        clock = 0.0
+        emitted = 0
+        vehicle_id = 0
+        while emitted < num_events:
+            clock += rng.expovariate(arrivals_per_hour / 3600.0)
+            while departures and departures[0][0] <= clock and emitted < num_events:
+                depart_time, license_plate, vehicle_type = heapq.heappop(departures)
+                yield ParkingEvent(depart_time, "depart", license_plate, vehicle_type)
+                emitted += 1
+            if emitted >= num_events:
+                break
+            vehicle_type = vehicle_types[rng.randrange(3)]
+            license_plate = f"V{vehicle_id}"
+            vehicle_id += 1
+            heapq.heappush(departures, (clock + rng.expovariate(1.0 / (mean_stay_hours * 3600.0)), license_plate, vehicle_type))
+            yield ParkingEvent(clock, "arrive", license_plate, vehicle_type)
+            emitted += 1
+
+    @staticmethod
+    def read_events(path: str) -> Iterator[ParkingEvent]:
+        # One "timestamp,arrive|depart,license_plate,CAR|MOTORCYCLE|TRUCK" record per line, read lazily
+        with open(path) as events_file:
+            for line in events_file:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                timestamp, kind, license_plate, vehicle_type = line.split(",")
+                yield ParkingEvent(float(timestamp), kind, license_plate, VehicleType[vehicle_type])
+
+    @staticmethod
+    def write_events(path: str, events: Iterable[ParkingEvent]) -> None:
+        with open(path, "w") as events_file:
+            for event in events:
+                events_file.write(f"{event.timestamp:.3f},{event.kind},{event.license_plate},{event.vehicle_type.name}\n")
+
+    def run(self, events: Iterable[ParkingEvent]) -> Dict[str, float]:
+        parking_lot = self.parking_lot
+        vehicle_classes = self.VEHICLE_CLASSES
+        park_latency = LatencyHistogram()
+        unpark_latency = LatencyHistogram()
+        perf_counter = time.perf_counter
+        processed = parked = rejected = departed = unknown_departures = 0
+        occupancy = peak_occupancy = 0
+
+        started = perf_counter()
+        for event in events:
+            processed += 1
+            if event.kind == "arrive":
+                vehicle = vehicle_classes[event.vehicle_type](event.license_plate)
+                op_start = perf_counter()
+                ticket = parking_lot.park_vehicle(vehicle)
+                park_latency.record(perf_counter() - op_start)
+                if ticket:
+                    parked += 1
+                    occupancy += 1
+                    if occupancy > peak_occupancy:
+                        peak_occupancy = occupancy
+                else:
+                    rejected += 1
+            else:
+                ticket = parking_lot.get_ticket(event.license_plate)
+                if ticket is None:
+                    unknown_departures += 1  # Vehicle was turned away on arrival
+                    continue
+                op_start = perf_counter()
+                released = parking_lot.unpark_by_ticket(ticket)
+                unpark_latency.record(perf_counter() - op_start)
+                if released:
+                    departed += 1
+                    occupancy -= 1
+        elapsed = perf_counter() - started
+
+        return {
+            "events": processed,
+            "elapsed_sec": elapsed,
+            "events_per_sec": processed / elapsed if elapsed > 0 else 0.0,
+            "parked": parked,
+            "rejected": rejected,
+            "departed": departed,
+            "unknown_departures": unknown_departures,
+            "peak_occupancy": peak_occupancy,
+            "park_p50_sec": park_latency.percentile(50),
+            "park_p99_sec": park_latency.percentile(99),
+            "unpark_p50_sec": unpark_latency.percentile(50),
+            "unpark_p99_sec": unpark_latency.percentile(99),
+        }
+
+    def report(self, events: Iterable[ParkingEvent]) -> Dict[str, float]:
+        stats = self.run(events)
+        print(f"Replayed {stats['events']} events in {stats['elapsed_sec']:.2f}s ({stats['events_per_sec']:.0f}/s)")
+        print(f"Parked {stats['parked']}, rejected {stats['rejected']}, departed {stats['departed']}, "
+              f"peak occupancy {stats['peak_occupancy']}")
+        print(f"Park latency p50<={stats['park_p50_sec'] * 1e6:.0f}us p99<={stats['park_p99_sec'] * 1e6:.0f}us, "
+              f"unpark latency p50<={stats['unpark_p50_sec'] * 1e6:.0f}us p99<={stats['unpark_p99_sec'] * 1e6:.0f}us")
+        return stats
+
+
+def _run_lot_shard(connection) -> None:
+    # Worker process loop: owns a subset of lots and answers one request at a time over its pipe
+    lots: Dict[str, ParkingLot] = {}
+    vehicle_classes = {VehicleType.CAR: Car, VehicleType.MOTORCYCLE: Motorcycle, VehicleType.TRUCK: Truck}
+    while True:
+        command, lot_id, payload = connection.recv()
+        if command == "stop":
+            connection.close()
+            return
+        try:
+            if command == "add_lot":
+                parking_lot = ParkingLot(lot_id)
+                for floor, num_spots in enumerate(payload, start=1):
+                    parking_lot.add_level(Level(floor, num_spots))
+                lots[lot_id] = parking_lot
+                result = True
+            elif command == "park":
+                license_plate, vehicle_type = payload
+                ticket = lots[lot_id].park_vehicle(vehicle_classes[vehicle_type](license_plate))
+                result = ticket.get_ticket_id() if ticket else None
+            elif command == "unpark":
+                ticket = lots[lot_id].get_ticket(payload)
+                result = ticket is not None and lots[lot_id].unpark_by_ticket(ticket)
+            elif command == "summary":
+                result = lots[lot_id].availability_summary()
+            else:
+                raise ValueError(f"Unknown command {command}")
+            # Every reply carries the lot's free counts so the registry's city-wide view stays current
+            connection.send((True, result, lots[lot_id].get_free_counts()))
+        except Exception as e:
+            connection.send((False, str(e), None))
+
+
+class ParkingLotRegistry:
+    def __init__(self, num_workers: int = 2):
+        self.connections = []
+        self.connection_locks: List[Lock] = []
+        self.workers = []
+        for _ in range(num_workers):
+            parent_connection, child_connection = Pipe()
+            worker = Process(target=_run_lot_shard, args=(child_connection,), daemon=True)
+            worker.start()
+            child_connection.close()
+            self.connections.append(parent_connection)
+            self.connection_locks.append(Lock())
+            self.workers.append(worker)
+        self.lot_shards: Dict[str, int] = {}
+        self.lot_locations: Dict[str, Tuple[float, float]] = {}
+        self.free_counts: Dict[str, Dict[VehicleType, int]] = {}
+
+    def _call(self, lot_id: str, command: str, payload=None):
+        shard = self.lot_shards.get(lot_id)
+        if shard is None:
+            raise ValueError(f"Unknown lot {lot_id}")
+        with self.connection_locks[shard]:
+            self.connections[shard].send((command, lot_id, payload))
+            ok, result, free_counts = self.connections[shard].recv()
+        if not ok:
+            raise RuntimeError(result)
+        self.free_counts[lot_id] = free_counts
+        return result
+
+    def add_lot(self, lot_id: str, spots_per_level: List[int], location: Tuple[float, float]) -> None:
+        if lot_id in self.lot_shards:
+            raise ValueError(f"Lot {lot_id} already registered")
+        self.lot_shards[lot_id] = len(self.lot_shards) % len(self.connections)  # Round-robin placement
+        self.lot_locations[lot_id] = location
+        self._call(lot_id, "add_lot", list(spots_per_level))
+
+    def park_vehicle(self, lot_id: str, vehicle: Vehicle) -> Optional[str]:
+        # Returns the ticket id, or None when the lot has no free spot for the vehicle
+        return self._call(lot_id, "park", (vehicle.license_plate, vehicle.get_type()))
+
+    def unpark_vehicle(self, lot_id: str, vehicle: Vehicle) -> bool:
+        return self._call(lot_id, "unpark", vehicle.license_plate)
+
+    def availability_summary(self, lot_id: str) -> Dict[int, Dict[VehicleType, Dict[str, int]]]:
+        return self._call(lot_id, "summary")
+
+    def find_nearest_lot(self, location: Tuple[float, float], vehicle_type: VehicleType) -> Optional[str]:
+        # Answered from the aggregated counts, without a round trip to any worker
+        best_lot, best_distance = None, None
+        for lot_id, counts in self.free_counts.items():
+            if counts[vehicle_type] <= 0:
+                continue
+            lot_x, lot_y = self.lot_locations[lot_id]
+            distance = (lot_x - location[0]) ** 2 + (lot_y - location[1]) ** 2
+            if best_distance is None or distance < best_distance:
+                best_lot, best_distance = lot_id, distance
+        return best_lot
+
+    def close(self) -> None:
+        for connection, connection_lock, worker in zip(self.connections, self.connection_locks, self.workers):
+            with connection_lock:
+                connection.send(("stop", None, None))
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 class ParkingLotDemo:
     def run():
         parking_lot = ParkingLot.get_instance()
@@ -238,4 +952,21 @@ class ParkingLotDemo:
         parking_lot.display_availability()
 
 if __name__ == "__main__":
-    ParkingLotDemo.run()
\ No newline at end of file
+    import sys
+    if "--gates" in sys.argv:
+        GateSimulation().report()
+    elif "--replay" in sys.argv:
+        parking_lot = ParkingLot()
+        for floor in range(1, 21):
+            parking_lot.add_level(Level(floor, 900))
+        EventReplaySimulator(parking_lot).report(EventReplaySimulator.synthetic_events(1_000_000, arrivals_per_hour=9000))
+    elif "--city" in sys.argv:
+        with ParkingLotRegistry(num_workers=2) as registry:
+            for lot_number in range(4):
+                registry.add_lot(f"LOT{lot_number}", [6, 6], (lot_number * 10.0, 0.0))
+            for i in range(5):
+                lot_id = registry.find_nearest_lot((0.0, 0.0), VehicleType.TRUCK)
+                print(f"Truck T{i} -> {lot_id}: {registry.park_vehicle(lot_id, Truck(f'T{i}'))}")
+            print(f"Nearest lot with a car spot: {registry.find_nearest_lot((35.0, 0.0), VehicleType.CAR)}")
+    else:
+        ParkingLotDemo.run()
\ No newline at end of file
@@ -102,6 +102,240 @@ class EmailNotification(NotificationStrategy):
         print(f"Sending Email to {contact_info}: {message}")
 
 
+# payment_metrics.py
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+
+class LatencyHistogram:
+    # Bucket upper bounds in seconds, doubling from 10us up to ~10s
+    BOUNDS = tuple(0.00001 * (2 ** i) for i in range(21))
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.buckets[bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent):
+        if self.count == 0:
+            return 0.0
+        rank = self.count * percent / 100.0
+        cumulative = 0
+        for index, bucket_count in enumerate(self.buckets):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return min(self.BOUNDS[index], self.max) if index < len(self.BOUNDS) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max
+        }
+
+
+# Metrics Exporter Interface
+class MetricsExporter(ABC):
+    @abstractmethod
+    def export(self, snapshot):
+        pass
+
+class ConsoleMetricsExporter(MetricsExporter):
+    def export(self, snapshot):
+        for method_name, outcomes in snapshot['methods'].items():
+            for outcome, stats in outcomes.items():
+                end_to_end = stats['stages'].get('end_to_end', {})
+                print(f"{method_name}/{outcome}: ~{stats['estimated_count']:.0f} payments, "
+                      f"{stats['throughput_per_sec']:.1f}/s, "
+                      f"p50={end_to_end.get('p50', 0.0) * 1000:.3f}ms p99={end_to_end.get('p99', 0.0) * 1000:.3f}ms")
+
+
+class PaymentMetrics:
+    STAGES = ("lock_wait", "processor", "notification", "end_to_end")
+
+    def __init__(self, sample_rate=0.1, exporter: MetricsExporter = None, export_interval=10.0):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.export_interval = export_interval
+        self.histograms = defaultdict(LatencyHistogram)  # (method, outcome, stage) -> histogram
+        self.started_at = time.monotonic()
+        self.last_export = self.started_at
+        self._lock = threading.Lock()  # Separate from the gateway lock so recording never blocks payments
+
+    def should_sample(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def set_exporter(self, exporter: MetricsExporter, export_interval=None):
+        self.exporter = exporter
+        if export_interval is not None:
+            self.export_interval = export_interval
+
+    def record(self, method_name, outcome, timings):
+        with self._lock:
+            for stage, seconds in timings.items():
+                self.histograms[(method_name, outcome, stage)].record(seconds)
+            now = time.monotonic()
+            export_due = self.exporter is not None and now - self.last_export >= self.export_interval
+            if export_due:
+                self.last_export = now
+        if export_due:
+            self.exporter.export(self.snapshot())
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started_at, 1e-9)
+            methods = {}
+            for (method_name, outcome, stage), histogram in self.histograms.items():
+                stats = methods.setdefault(method_name, {}).setdefault(outcome, {'stages': {}})
+                stats['stages'][stage] = histogram.snapshot()
+            for outcomes in methods.values():
+                for stats in outcomes.values():
+                    sampled = stats['stages'].get('end_to_end', {}).get('count', 0)
+                    stats['sampled_count'] = sampled
+                    # Scale sampled counts back up to estimate the real volume
+                    stats['estimated_count'] = sampled / self.sample_rate if self.sample_rate > 0 else 0
+                    stats['throughput_per_sec'] = stats['estimated_count'] / elapsed
+            return {'elapsed_sec': elapsed, 'sample_rate': self.sample_rate, 'methods': methods}
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.started_at = time.monotonic()
+            self.last_export = self.started_at
+
+
+# payment_resilience.py
+from collections import deque
+from enum import Enum
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate  # Tokens added per second
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens=1):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def refund(self, tokens=1):
+        # Returns tokens taken for a call that was rejected by a later check
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + tokens)
+
+
+class CircuitState(Enum):
+    CLOSED = 1
+    OPEN = 2
+    HALF_OPEN = 3
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=0.5, latency_threshold=None, window_size=20, min_calls=10, reset_timeout=5.0):
+        self.failure_threshold = failure_threshold  # Fraction of bad calls in the window that opens the circuit
+        self.latency_threshold = latency_threshold  # Calls slower than this (seconds) count as bad
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.outcomes = deque(maxlen=window_size)  # True for a bad call
+        self.state = CircuitState.CLOSED
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == CircuitState.CLOSED:
+                return True
+            if self.state == CircuitState.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = CircuitState.HALF_OPEN
+                self.trial_in_flight = False
+            # Half-open: let a single trial call through to probe the processor
+            if self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record(self, success, latency):
+        bad = not success or (self.latency_threshold is not None and latency > self.latency_threshold)
+        with self._lock:
+            if self.state == CircuitState.HALF_OPEN:
+                self.trial_in_flight = False
+                if bad:
+                    self._open()
+                else:
+                    self.state = CircuitState.CLOSED
+                    self.outcomes.clear()
+                return
+            self.outcomes.append(bad)
+            if self.state == CircuitState.CLOSED and len(self.outcomes) >= self.min_calls and \
+                    sum(self.outcomes) / len(self.outcomes) >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = CircuitState.OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+
+    def get_state(self):
+        return self.state
+
+
+class PaymentMethodGuard:
+    def __init__(self, rate_limit=None, burst=None, max_concurrent=None, circuit_breaker: CircuitBreaker = None):
+        self.token_bucket = TokenBucket(rate_limit, burst) if rate_limit else None
+        self.slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self.circuit_breaker = circuit_breaker
+
+    def try_acquire(self):
+        # Returns None when the call may proceed, otherwise the rejection reason.
+        # A token is only kept by calls that pass every check, so rejections do not eat into the rate.
+        if self.slots and not self.slots.acquire(blocking=False):
+            return "concurrency limit reached"
+        if self.token_bucket and not self.token_bucket.try_acquire():
+            if self.slots:
+                self.slots.release()
+            return "rate limit exceeded"
+        if self.circuit_breaker and not self.circuit_breaker.allow_request():
+            if self.token_bucket:
+                self.token_bucket.refund()
+            if self.slots:
+                self.slots.release()
+            return "circuit open"
+        return None
+
+    def release(self, success, latency):
+        if self.slots:
+            self.slots.release()
+        if self.circuit_breaker:
+            self.circuit_breaker.record(success, latency)
+
+
 # payment_gateway.py
 import threading  # Import threading for locks
 
@@ -115,17 +349,29 @@ class PaymentGateway:
                 cls._instance = super(PaymentGateway, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self, notification_strategy: NotificationStrategy = None):
+    def __init__(self, notification_strategy: NotificationStrategy = None, metrics: PaymentMetrics = None):
         if not hasattr(self, 'initialized'):  # Prevent re-initialization
             self.notification_strategy = notification_strategy
             self.payment_methods = {}
+            self.metrics = metrics or PaymentMetrics()
+            self.method_guards = {}
             self.initialized = True
 
+    @classmethod
+    def reset_instance(cls):
+        with cls._lock:
+            cls._instance = None
+
     def add_payment_method(self, payment_method: PaymentStrategy):
         with self._lock:  # Lock to ensure thread-safe modification
             self.payment_methods[payment_method.get_name()] = payment_method
             print(f"Payment method {payment_method.get_name()} added.")
 
+    def configure_method_limits(self, payment_method_name, rate_limit=None, burst=None, max_concurrent=None,
+                                circuit_breaker: CircuitBreaker = None):
+        with self._lock:  # Lock to ensure thread-safe modification
+            self.method_guards[payment_method_name] = PaymentMethodGuard(rate_limit, burst, max_concurrent, circuit_breaker)
+
     def get_available_payment_methods(self):
         print("Available payment methods:")
         for payment_method in self.payment_methods:
@@ -140,34 +386,91 @@ class PaymentGateway:
                 print(f"Payment method not available.")
 
     def execute_payment(self, user: User, amount, currency, selected_payment_method=None):
+        sampled = self.metrics.should_sample()
+        timings = {}
+        requested_method = selected_payment_method or user.account.get_preferred_payment_method()
+        method_name = requested_method.get_name() if requested_method else "none"
+        outcome = "error"
+        start = time.perf_counter()
         try:
             with self._lock:  # Lock to ensure thread-safe access
+                if sampled:
+                    timings['lock_wait'] = time.perf_counter() - start
+
                 if not user.account.has_sufficient_balance(amount):
                     print("Insufficient balance for the payment.")
+                    outcome = "insufficient_balance"
                     return  # Fail the payment process
 
                 if selected_payment_method:
-                    if selected_payment_method.get_name() in self.payment_methods:
-                        selected_payment_method.process_payment(amount, currency)
-                        transaction_id = self._log_transaction(user, amount, currency, selected_payment_method.get_name())
-                        print(f"Payment processed using {selected_payment_method.get_name()}")
-                    else:
+                    if selected_payment_method.get_name() not in self.payment_methods:
                         print("Selected payment method is not available.")
+                        outcome = "method_unavailable"
                         return
+                    payment_method = selected_payment_method
                 else:
-                    preferred_payment_method = user.account.get_preferred_payment_method()
-                    if preferred_payment_method:
-                        preferred_payment_method.process_payment(amount, currency)
-                        transaction_id = self._log_transaction(user, amount, currency, preferred_payment_method.get_name())
-                    else:
+                    payment_method = user.account.get_preferred_payment_method()
+                    if not payment_method:
                         print("No preferred payment method set for the user.")
+                        outcome = "no_method"
                         return
 
-                message = f"Dear {user.name}, your payment of {amount} {currency} has been processed."
-                self.notification_strategy.send_notification(user.phone, message)
+            # Processors run outside the gateway lock so one slow method cannot stall the others
+            payment_method, guard, reason = self._admit_payment_method(user, payment_method)
+            if payment_method is None:
+                print(f"Payment method {method_name} unavailable: {reason}")
+                outcome = "rejected"
+                return
+            method_name = payment_method.get_name()
+
+            stage_start = time.perf_counter()
+            try:
+                payment_method.process_payment(amount, currency)
+            except Exception:
+                if guard:
+                    guard.release(False, time.perf_counter() - stage_start)
+                raise
+            processor_time = time.perf_counter() - stage_start
+            if guard:
+                guard.release(True, processor_time)
+            if sampled:
+                timings['processor'] = processor_time
+
+            with self._lock:
+                transaction_id = self._log_transaction(user, amount, currency, method_name)
+            if selected_payment_method:
+                print(f"Payment processed using {method_name}")
+
+            message = f"Dear {user.name}, your payment of {amount} {currency} has been processed."
+            stage_start = time.perf_counter()
+            self.notification_strategy.send_notification(user.phone, message)
+            if sampled:
+                timings['notification'] = time.perf_counter() - stage_start
+            outcome = "success"
 
         except Exception as e:
             print(f"Error processing payment: {e}")
+        finally:
+            if sampled:
+                timings['end_to_end'] = time.perf_counter() - start
+                self.metrics.record(method_name, outcome, timings)
+
+    def _admit_payment_method(self, user: User, payment_method):
+        # Returns (method, guard, None) for the method allowed to run, or (None, None, reason) when rejected
+        guard = self.method_guards.get(payment_method.get_name())
+        reason = guard.try_acquire() if guard else None
+        if reason is None:
+            return payment_method, guard, None
+
+        # Fall back to the user's preferred method when the requested one is throttled or tripped
+        preferred_payment_method = user.account.get_preferred_payment_method()
+        if preferred_payment_method and preferred_payment_method.get_name() != payment_method.get_name():
+            fallback_guard = self.method_guards.get(preferred_payment_method.get_name())
+            if fallback_guard is None or fallback_guard.try_acquire() is None:
+                print(f"Payment method {payment_method.get_name()} unavailable ({reason}), "
+                      f"falling back to {preferred_payment_method.get_name()}")
+                return preferred_payment_method, fallback_guard, None
+        return None, None, reason
 
     def _log_transaction(self, user: User, amount, currency, payment_method_name):
         transaction = {
@@ -187,6 +490,223 @@ class PaymentGateway:
     def get_transaction_history(self, user: User):
         return user.account.get_transaction_history()
 
+    def get_metrics_snapshot(self):
+        return self.metrics.snapshot()
+
+    def set_metrics_exporter(self, exporter: MetricsExporter, export_interval=None):
+        self.metrics.set_exporter(exporter, export_interval)
+
+
+# payment_load_test.py
+import contextlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SimulatedPayment(PaymentStrategy):
+    def __init__(self, name, latency=0.0, failure_rate=0.0):
+        self.payment_name = name
+        self.latency = latency  # Seconds spent "talking" to the downstream processor
+        self.failure_rate = failure_rate
+
+    def get_name(self):
+        return self.payment_name
+
+    def process_payment(self, amount, currency):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError(f"{self.payment_name} processor failed")
+
+
+class NullNotification(NotificationStrategy):
+    def send_notification(self, contact_info, message):
+        pass
+
+
+class PaymentGatewayBenchmark:
+    def __init__(self, num_users=100, num_workers=8, num_operations=5000, refund_ratio=0.1,
+                 method_latencies=None, mode="threads", initial_balance=10 ** 9, seed=42):
+        self.num_users = num_users
+        self.num_workers = num_workers
+        self.num_operations = num_operations
+        self.refund_ratio = refund_ratio  # Fraction of operations that refund an earlier payment
+        self.method_latencies = method_latencies or {"FakeCard": 0.0, "FakeUpi": 0.0, "FakeWallet": 0.0}
+        self.mode = mode  # "threads" or "async"
+        self.initial_balance = initial_balance
+        self.seed = seed
+
+    @staticmethod
+    def summarize(latencies, elapsed):
+        if not latencies:
+            return {'count': 0, 'per_sec': 0.0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+        latencies = sorted(latencies)
+        return {
+            'count': len(latencies),
+            'per_sec': len(latencies) / elapsed if elapsed > 0 else 0.0,
+            'p50': latencies[len(latencies) // 2],
+            'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            'max': latencies[-1]
+        }
+
+    def _setup(self):
+        PaymentGateway.reset_instance()
+        payment_gateway = PaymentGateway(NullNotification(), PaymentMetrics(sample_rate=0.0))
+        methods = [SimulatedPayment(name, latency) for name, latency in self.method_latencies.items()]
+        for method in methods:
+            payment_gateway.add_payment_method(method)
+        users = []
+        for user_id in range(self.num_users):
+            user = User(user_id, f"user{user_id}", f"user{user_id}@example.com", "0000000000")
+            user.account.set_balance(self.initial_balance)
+            payment_gateway.set_preferred_payment_method(user, methods[user_id % len(methods)])
+            users.append(user)
+        return payment_gateway, methods, users
+
+    def _plan(self, worker_id, users, methods):
+        # Each worker owns a disjoint slice of users so refunds only touch its own history
+        rng = random.Random(self.seed + worker_id)
+        own_users = users[worker_id::self.num_workers] or users
+        count = self.num_operations // self.num_workers + (1 if worker_id < self.num_operations % self.num_workers else 0)
+        for _ in range(count):
+            user = rng.choice(own_users)
+            if user.account.get_transaction_history() and rng.random() < self.refund_ratio:
+                yield "refund", user, rng.randint(1, len(user.account.get_transaction_history()))
+            else:
+                # Half the payments pick a method explicitly, the rest use the preferred one
+                yield "payment", user, rng.choice(methods) if rng.random() < 0.5 else None
+
+    def _run_worker(self, payment_gateway, worker_id, users, methods):
+        payment_latencies = []
+        refund_latencies = []
+        for operation, user, argument in self._plan(worker_id, users, methods):
+            start = time.perf_counter()
+            if operation == "refund":
+                payment_gateway.refund_payment(user, argument)
+                refund_latencies.append(time.perf_counter() - start)
+            else:
+                payment_gateway.execute_payment(user, 1, 'USD', selected_payment_method=argument)
+                payment_latencies.append(time.perf_counter() - start)
+        return payment_latencies, refund_latencies
+
+    async def _run_async(self, payment_gateway, users, methods):
+        import asyncio
+        # The gateway is synchronous, so each task drives it from the default executor
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            tasks = [loop.run_in_executor(executor, self._run_worker, payment_gateway, worker_id, users, methods)
+                     for worker_id in range(self.num_workers)]
+            return await asyncio.gather(*tasks)
+
+    def run(self):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            payment_gateway, methods, users = self._setup()
+            started = time.perf_counter()
+            if self.mode == "async":
+                import asyncio
+                results = asyncio.run(self._run_async(payment_gateway, users, methods))
+            else:
+                with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+                    futures = [executor.submit(self._run_worker, payment_gateway, worker_id, users, methods)
+                               for worker_id in range(self.num_workers)]
+                    results = [future.result() for future in futures]
+            elapsed = time.perf_counter() - started
+        PaymentGateway.reset_instance()
+
+        payment_latencies = [latency for payments, _ in results for latency in payments]
+        refund_latencies = [latency for _, refunds in results for latency in refunds]
+        return {
+            'elapsed_sec': elapsed,
+            'payments': self.summarize(payment_latencies, elapsed),
+            'refunds': self.summarize(refund_latencies, elapsed)
+        }
+
+    def report(self):
+        result = self.run()
+        print(f"Benchmark ({self.mode}, {self.num_workers} workers, {self.num_users} users): "
+              f"{result['elapsed_sec']:.2f}s")
+        for operation in ('payments', 'refunds'):
+            stats = result[operation]
+            print(f"  {operation}: {stats['count']} ops, {stats['per_sec']:.1f}/s, "
+                  f"p50={stats['p50'] * 1000:.3f}ms p99={stats['p99'] * 1000:.3f}ms max={stats['max'] * 1000:.3f}ms")
+        return result
+
+
+class ResilienceLoadTest:
+    @staticmethod
+    def _run_scenario(guarded, num_payments, num_threads, slow_latency, fast_latency):
+        PaymentGateway.reset_instance()
+        payment_gateway = PaymentGateway(NullNotification(), PaymentMetrics(sample_rate=0.0))
+        slow_method = SimulatedPayment("SlowCard", latency=slow_latency)
+        fast_method = SimulatedPayment("FastUpi", latency=fast_latency)
+        if guarded:
+            payment_gateway.configure_method_limits(
+                "SlowCard", rate_limit=500, max_concurrent=4,
+                circuit_breaker=CircuitBreaker(failure_threshold=0.5, latency_threshold=slow_latency / 4,
+                                               window_size=10, min_calls=4, reset_timeout=0.5))
+
+        users = []
+        for user_id in range(num_threads):
+            user = User(user_id, f"user{user_id}", f"user{user_id}@example.com", "0000000000")
+            user.account.set_balance(10 ** 9)
+            users.append(user)
+
+        # Latencies grouped by the path each call took, so fail-fast calls are not hidden by the slow ones
+        latencies = {}
+        latencies_lock = threading.Lock()
+
+        def worker(user, count):
+            local = {}
+            for _ in range(count):
+                history_length = len(user.account.get_transaction_history())
+                start = time.perf_counter()
+                payment_gateway.execute_payment(user, 1, 'USD', selected_payment_method=slow_method)
+                latency = time.perf_counter() - start
+                history = user.account.get_transaction_history()
+                if len(history) == history_length:
+                    path = "rejected"
+                elif history[-1]['payment_method'] == slow_method.get_name():
+                    path = "slow processor"
+                else:
+                    path = "fallback"
+                local.setdefault(path, []).append(latency)
+            with latencies_lock:
+                for path, values in local.items():
+                    latencies.setdefault(path, []).extend(values)
+
+        # The gateway reports through print; silence it so console I/O does not skew timings
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            payment_gateway.add_payment_method(slow_method)
+            payment_gateway.add_payment_method(fast_method)
+            for user in users:
+                payment_gateway.set_preferred_payment_method(user, fast_method)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                per_thread = num_payments // num_threads
+                for user in users:
+                    executor.submit(worker, user, per_thread)
+            elapsed = time.perf_counter() - started
+
+        PaymentGateway.reset_instance()
+        overall = PaymentGatewayBenchmark.summarize([value for values in latencies.values() for value in values], elapsed)
+        by_path = {path: PaymentGatewayBenchmark.summarize(values, elapsed) for path, values in latencies.items()}
+        return overall, by_path
+
+    @staticmethod
+    def run(num_payments=400, num_threads=16, slow_latency=0.2, fast_latency=0.001):
+        for guarded in (False, True):
+            overall, by_path = ResilienceLoadTest._run_scenario(guarded, num_payments, num_threads,
+                                                                slow_latency, fast_latency)
+            label = "with limits + circuit breaker" if guarded else "without limits"
+            print(f"{label}: {overall['count']} payments in {overall['count'] / overall['per_sec']:.2f}s, "
+                  f"p50={overall['p50'] * 1000:.1f}ms p99={overall['p99'] * 1000:.1f}ms")
+            for path in ("slow processor", "fallback", "rejected"):
+                result = by_path.get(path)
+                if result:
+                    print(f"  {path:<15} {result['count']:>5} calls ({result['count'] / overall['count']:.0%}) "
+                          f"p50={result['p50'] * 1000:.1f}ms p99={result['p99'] * 1000:.1f}ms "
+                          f"max={result['max'] * 1000:.1f}ms")
+
 
 # PaymentGatewayDemo class for testing
 class PaymentGatewayDemo:
@@ -194,7 +714,7 @@ class PaymentGatewayDemo:
     def run_demo():
         # Create a PaymentGateway with SMS notification
         notification_method = SmsNotification()
-        payment_gateway = PaymentGateway(notification_method)
+        payment_gateway = PaymentGateway(notification_method, PaymentMetrics(sample_rate=1.0))
 
         payment_gateway.add_payment_method(CreditCardPayment())
         payment_gateway.add_payment_method(UpiPayment())
@@ -232,8 +752,19 @@ class PaymentGatewayDemo:
         print("\nTransaction History after refund:")
         print(payment_gateway.get_transaction_history(user))
 
+        # Export the latency metrics collected so far
+        print("\nPayment Metrics:")
+        ConsoleMetricsExporter().export(payment_gateway.get_metrics_snapshot())
+
 
 # Example usage
 if __name__ == "__main__":
-    PaymentGatewayDemo.run_demo()
+    import sys
+    if "--benchmark" in sys.argv:
+        PaymentGatewayBenchmark().report()
+        PaymentGatewayBenchmark(mode="async", method_latencies={"FakeCard": 0.001, "FakeUpi": 0.002}).report()
+    elif "--load-test" in sys.argv:
+        ResilienceLoadTest.run()
+    else:
+        PaymentGatewayDemo.run_demo()
 